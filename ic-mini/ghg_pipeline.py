@@ -17,9 +17,11 @@ Interaction Calculus の活用:
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from datetime import datetime, date
 from enum import Enum
+from array import array
+from functools import lru_cache
 import json
 
 import sys
@@ -31,7 +33,7 @@ from ic import evaluate, parse, Sup, Dup, Num, Lam, App
 # データ型定義（型 = ノード）
 # =============================================================================
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Type:
     """型の基底クラス"""
     name: str
@@ -41,7 +43,7 @@ class Type:
 
 # --- 生産管理系データ型 ---
 
-@dataclass
+@dataclass(slots=True)
 class ProductionRecord:
     """生産記録"""
     product_id: str
@@ -53,7 +55,7 @@ class ProductionRecord:
     duration_hours: float  # 稼働時間
 
 
-@dataclass
+@dataclass(slots=True)
 class EnergyConsumption:
     """エネルギー消費データ"""
     electricity_kwh: float  # 電力消費量
@@ -61,9 +63,13 @@ class EnergyConsumption:
     heavy_oil_l: float  # 重油消費量
     lpg_kg: float  # LPG消費量
     period: str  # 期間
+    
+    def as_scope1_vec(self) -> Tuple[float, float, float]:
+        """Scope1 対象の燃料消費量ベクトル（都市ガス, 重油, LPG）"""
+        return (self.natural_gas_m3, self.heavy_oil_l, self.lpg_kg)
 
 
-@dataclass
+@dataclass(slots=True)
 class MaterialInput:
     """原材料投入データ"""
     material_id: str
@@ -74,61 +80,128 @@ class MaterialInput:
     transport_distance_km: float
 
 
-@dataclass 
+@dataclass(slots=True)
 class WasteOutput:
     """廃棄物データ"""
     waste_type: str
     quantity_kg: float
     treatment_method: str  # landfill, incineration, recycling
+    treatment_idx: int = field(init=False, repr=False, compare=False)  # WASTE_FACTORS の添字
+    
+    def __post_init__(self):
+        self.treatment_method = sys.intern(self.treatment_method)
+        self.treatment_idx = WASTE_METHODS.get(self.treatment_method, len(WASTE_METHODS))
 
 
-@dataclass
+@dataclass(slots=True)
 class TransportData:
     """輸送データ"""
     mode: str  # truck, ship, rail, air
     distance_km: float
     weight_ton: float
+    mode_idx: int = field(init=False, repr=False, compare=False)  # TRANSPORT_FACTORS の添字
+    
+    def __post_init__(self):
+        self.mode = sys.intern(self.mode)
+        self.mode_idx = TRANSPORT_MODES.get(self.mode, len(TRANSPORT_MODES))
+
+
+# --- 列指向バッチ（レコード列をフィールドごとの配列で保持） ---
+
+@dataclass(slots=True)
+class MaterialBatch:
+    """原材料投入データのバッチ"""
+    quantities: array
+    transport_distances: array
+    
+    @classmethod
+    def from_records(cls, materials: List[MaterialInput]) -> "MaterialBatch":
+        return cls(
+            quantities=array('d', [m.quantity for m in materials]),
+            transport_distances=array('d', [m.transport_distance_km for m in materials])
+        )
+    
+    def __len__(self) -> int:
+        return len(self.quantities)
+
+
+@dataclass(slots=True)
+class TransportBatch:
+    """輸送データのバッチ（mode は係数テーブルの添字で保持）"""
+    mode_idx: array
+    distances: array
+    weights: array
+    
+    @classmethod
+    def from_records(cls, transports: List[TransportData]) -> "TransportBatch":
+        return cls(
+            mode_idx=array('i', [t.mode_idx for t in transports]),
+            distances=array('d', [t.distance_km for t in transports]),
+            weights=array('d', [t.weight_ton for t in transports])
+        )
+    
+    def __len__(self) -> int:
+        return len(self.mode_idx)
+
+
+@dataclass(slots=True)
+class WasteBatch:
+    """廃棄物データのバッチ（処理方法は係数テーブルの添字で保持）"""
+    treatment_idx: array
+    quantities: array
+    
+    @classmethod
+    def from_records(cls, wastes: List[WasteOutput]) -> "WasteBatch":
+        return cls(
+            treatment_idx=array('i', [w.treatment_idx for w in wastes]),
+            quantities=array('d', [w.quantity_kg for w in wastes])
+        )
+    
+    def __len__(self) -> int:
+        return len(self.quantities)
 
 
 # --- GHG計算中間データ型 ---
 
-@dataclass
+# 排出量レコードは不変。total_co2_ton は生成時に1回だけ換算して保持する
+
+@dataclass(frozen=True, slots=True)
 class Scope1Emission:
     """Scope1排出量（直接排出）"""
     natural_gas_co2_kg: float
     heavy_oil_co2_kg: float
     lpg_co2_kg: float
     total_co2_kg: float
+    total_co2_ton: float = field(init=False, repr=False, compare=False)
     
-    @property
-    def total_co2_ton(self):
-        return self.total_co2_kg / 1000
+    def __post_init__(self):
+        object.__setattr__(self, "total_co2_ton", self.total_co2_kg / 1000)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Scope2Emission:
     """Scope2排出量（電力由来）"""
     electricity_co2_kg: float
     method: str  # "location-based" or "market-based"
+    total_co2_ton: float = field(init=False, repr=False, compare=False)
     
-    @property
-    def total_co2_ton(self):
-        return self.electricity_co2_kg / 1000
+    def __post_init__(self):
+        object.__setattr__(self, "total_co2_ton", self.electricity_co2_kg / 1000)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Scope3Emission:
     """Scope3排出量（その他間接）"""
     category: str  # 1-15のカテゴリ
     description: str
     co2_kg: float
+    total_co2_ton: float = field(init=False, repr=False, compare=False)
     
-    @property
-    def total_co2_ton(self):
-        return self.co2_kg / 1000
+    def __post_init__(self):
+        object.__setattr__(self, "total_co2_ton", self.co2_kg / 1000)
 
 
-@dataclass
+@dataclass(slots=True)
 class GHGReport:
     """GHGレポート（最終出力）"""
     reporting_period: str
@@ -141,26 +214,44 @@ class GHGReport:
     details: Dict[str, Any] = field(default_factory=dict)
     calculation_method: str = ""
     
-    def to_json(self) -> str:
-        return json.dumps({
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON出力用の辞書"""
+        scope1, scope2, scope3, total = (
+            round(v, 2) for v in
+            (self.scope1_total_ton, self.scope2_total_ton, self.scope3_total_ton, self.total_ton)
+        )
+        return {
             "reporting_period": self.reporting_period,
             "organization": self.organization,
             "emissions": {
-                "scope1": {"total_ton_co2": round(self.scope1_total_ton, 2)},
-                "scope2": {"total_ton_co2": round(self.scope2_total_ton, 2)},
-                "scope3": {"total_ton_co2": round(self.scope3_total_ton, 2)},
-                "total": {"total_ton_co2": round(self.total_ton, 2)}
+                "scope1": {"total_ton_co2": scope1},
+                "scope2": {"total_ton_co2": scope2},
+                "scope3": {"total_ton_co2": scope3},
+                "total": {"total_ton_co2": total}
             },
             "intensity": round(self.intensity, 4),
             "calculation_method": self.calculation_method,
             "details": self.details
-        }, indent=2, ensure_ascii=False)
+        }
+    
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
 
 
 # =============================================================================
 # 排出係数（Emission Factors）
 # =============================================================================
 
+# 輸送モード・廃棄物処理方法のキー（intern 済み。レコード側も __post_init__ で intern する）
+TRUCK = sys.intern("truck")
+SHIP = sys.intern("ship")
+RAIL = sys.intern("rail")
+AIR = sys.intern("air")
+LANDFILL = sys.intern("landfill")
+INCINERATION = sys.intern("incineration")
+RECYCLING = sys.intern("recycling")
+
+
 class EmissionFactors:
     """
     排出係数データベース
@@ -195,20 +286,80 @@ class EmissionFactors:
     
     # 輸送の排出係数（ton-km あたり kg-CO2）
     TRANSPORT = {
-        "truck": 0.0472,
-        "ship": 0.0079,
-        "rail": 0.0198,
-        "air": 0.8063,
+        TRUCK: 0.0472,
+        SHIP: 0.0079,
+        RAIL: 0.0198,
+        AIR: 0.8063,
     }
     
+    # 購入物品の排出係数（簡略化：材料1kgあたり kg-CO2）
+    MATERIAL = 1.5
+    
     # 廃棄物処理の排出係数
     WASTE = {
-        "landfill": 0.5,  # kg-CO2 per kg waste
-        "incineration": 2.5,
-        "recycling": 0.1,
+        LANDFILL: 0.5,  # kg-CO2 per kg waste
+        INCINERATION: 2.5,
+        RECYCLING: 0.1,
     }
 
 
+def _build_scope1_factor_vec(factors: Dict) -> Tuple[float, float, float]:
+    """Scope1 係数ベクトル（EnergyConsumption.as_scope1_vec と同じ並び）"""
+    return (
+        factors["natural_gas_kg_co2_per_m3"],
+        factors["heavy_oil_kg_co2_per_l"],
+        factors["lpg_kg_co2_per_kg"],
+    )
+
+
+# 組み込み係数セットの Scope1 係数ベクトル（計算器インスタンス間で共有）
+SCOPE1_FACTORS_MOE = _build_scope1_factor_vec(EmissionFactors.JAPAN_MOE)
+SCOPE1_FACTORS_GHG = _build_scope1_factor_vec(EmissionFactors.GHG_PROTOCOL)
+
+
+def scope1_factor_vec(factors: Dict) -> Tuple[float, float, float]:
+    """係数セットに対応する Scope1 係数ベクトル（組み込みセットは共有の定数を返す）"""
+    if factors is EmissionFactors.JAPAN_MOE:
+        return SCOPE1_FACTORS_MOE
+    if factors is EmissionFactors.GHG_PROTOCOL:
+        return SCOPE1_FACTORS_GHG
+    return _build_scope1_factor_vec(factors)
+
+
+# 係数テーブル（配列）と添字。未知のモード／処理方法は末尾のデフォルト係数を指す
+MATERIAL_FACTORS = array('d', [EmissionFactors.MATERIAL])
+TRANSPORT_MODES = {mode: i for i, mode in enumerate(EmissionFactors.TRANSPORT)}
+TRANSPORT_FACTORS = array('d', [*EmissionFactors.TRANSPORT.values(), 0.05])
+WASTE_METHODS = {method: i for i, method in enumerate(EmissionFactors.WASTE)}
+WASTE_FACTORS = array('d', [*EmissionFactors.WASTE.values(), 1.0])
+
+
+def _weighted_sum(qty: array, idx: Optional[array], factors: array) -> float:
+    """
+    Σ qty[i] * factors[idx[i]] を計算（Scope3 集計の数値コア）
+    
+    idx が None なら全要素に factors[0] を掛ける（係数が1つのカテゴリ用）
+    """
+    total = 0.0
+    if idx is None:
+        factor = factors[0]
+        for q in qty:
+            total += q * factor
+        return total
+    for q, i in zip(qty, idx):
+        total += q * factors[i]
+    return total
+
+
+def _expand_totals(s1: array, s2: array, scope3_total: float) -> List[List[float]]:
+    """
+    totals[i][j] = s1[i] + s2[j] + scope3_total
+    
+    generate_with_superposition が各レポートの total_ton としてそのまま使う
+    """
+    return [[t1 + t2 + scope3_total for t2 in s2] for t1 in s1]
+
+
 # =============================================================================
 # 変換関数（エッジ）- implを持つ
 # =============================================================================
@@ -222,14 +373,17 @@ class GHGCalculator:
     
     def __init__(self, factors: Dict = None):
         self.factors = factors or EmissionFactors.JAPAN_MOE
+        self._scope1_factors = scope1_factor_vec(self.factors)
     
     # --- Scope 1 計算 ---
     
     def energy_to_scope1(self, energy: EnergyConsumption) -> Scope1Emission:
         """EnergyConsumption → Scope1Emission"""
-        gas_co2 = energy.natural_gas_m3 * self.factors["natural_gas_kg_co2_per_m3"]
-        oil_co2 = energy.heavy_oil_l * self.factors["heavy_oil_kg_co2_per_l"]
-        lpg_co2 = energy.lpg_kg * self.factors["lpg_kg_co2_per_kg"]
+        gas, oil, lpg = energy.as_scope1_vec()
+        gas_f, oil_f, lpg_f = self._scope1_factors
+        gas_co2 = gas * gas_f
+        oil_co2 = oil * oil_f
+        lpg_co2 = lpg * lpg_f
         
         return Scope1Emission(
             natural_gas_co2_kg=gas_co2,
@@ -263,40 +417,111 @@ class GHGCalculator:
     
     # --- Scope 3 計算 ---
     
-    def material_to_scope3_cat1(self, material: MaterialInput) -> Scope3Emission:
+    # include_descriptions=False の場合は明細文字列（description）を組み立てない
+    
+    def _scope3_emission(self, category: str, record: Any, co2_kg: float,
+                         include_descriptions: bool) -> Scope3Emission:
+        """カテゴリ（Cat1/Cat4/Cat5）とレコードから Scope3Emission を作る"""
+        if not include_descriptions:
+            description = ""
+        elif category == "Cat1":
+            description = f"Purchased goods: {record.material_name}"
+        elif category == "Cat4":
+            description = f"Transport ({record.mode}): {record.distance_km}km"
+        else:
+            description = f"Waste ({record.treatment_method}): {record.quantity_kg}kg"
+        return Scope3Emission(category=category, description=description, co2_kg=co2_kg)
+    
+    def material_to_scope3_cat1(self, material: MaterialInput,
+                                include_descriptions: bool = True) -> Scope3Emission:
         """MaterialInput → Scope3Emission (Category 1: 購入物品)"""
         # 簡略化：材料1kgあたり1.5kg-CO2と仮定
-        factor = 1.5
+        factor = EmissionFactors.MATERIAL
         co2 = material.quantity * factor
         
-        return Scope3Emission(
-            category="Cat1",
-            description=f"Purchased goods: {material.material_name}",
-            co2_kg=co2
-        )
+        return self._scope3_emission("Cat1", material, co2, include_descriptions)
     
-    def transport_to_scope3_cat4(self, transport: TransportData) -> Scope3Emission:
+    def transport_to_scope3_cat4(self, transport: TransportData,
+                                 include_descriptions: bool = True) -> Scope3Emission:
         """TransportData → Scope3Emission (Category 4: 輸送)"""
         ton_km = transport.weight_ton * transport.distance_km
-        factor = EmissionFactors.TRANSPORT.get(transport.mode, 0.05)
+        factor = TRANSPORT_FACTORS[transport.mode_idx]
         co2 = ton_km * factor
         
-        return Scope3Emission(
-            category="Cat4",
-            description=f"Transport ({transport.mode}): {transport.distance_km}km",
-            co2_kg=co2
-        )
+        return self._scope3_emission("Cat4", transport, co2, include_descriptions)
     
-    def waste_to_scope3_cat5(self, waste: WasteOutput) -> Scope3Emission:
+    def waste_to_scope3_cat5(self, waste: WasteOutput,
+                             include_descriptions: bool = True) -> Scope3Emission:
         """WasteOutput → Scope3Emission (Category 5: 廃棄物)"""
-        factor = EmissionFactors.WASTE.get(waste.treatment_method, 1.0)
+        factor = WASTE_FACTORS[waste.treatment_idx]
         co2 = waste.quantity_kg * factor
         
-        return Scope3Emission(
-            category="Cat5",
-            description=f"Waste ({waste.treatment_method}): {waste.quantity_kg}kg",
-            co2_kg=co2
+        return self._scope3_emission("Cat5", waste, co2, include_descriptions)
+    
+    # --- Scope 3 一括計算（レコード列 → CO2量の配列） ---
+    
+    def materials_to_scope3_vec(self, batch: MaterialBatch) -> array:
+        """MaterialBatch → Cat1 の CO2量（kg）の配列"""
+        factor = EmissionFactors.MATERIAL
+        return array('d', [q * factor for q in batch.quantities])
+    
+    def transports_to_scope3_vec(self, batch: TransportBatch) -> array:
+        """TransportBatch → Cat4 の CO2量（kg）の配列"""
+        factors = TRANSPORT_FACTORS
+        return array('d', [w * d * factors[i] for w, d, i
+                           in zip(batch.weights, batch.distances, batch.mode_idx)])
+    
+    def wastes_to_scope3_vec(self, batch: WasteBatch) -> array:
+        """WasteBatch → Cat5 の CO2量（kg）の配列"""
+        factors = WASTE_FACTORS
+        return array('d', [q * factors[i] for q, i
+                           in zip(batch.quantities, batch.treatment_idx)])
+    
+    def scope3_total_kg(self,
+                        materials: MaterialBatch,
+                        transports: TransportBatch,
+                        wastes: WasteBatch) -> float:
+        """Scope3 の合計 CO2量（kg）をカテゴリごとに一括集計"""
+        material_kg = _weighted_sum(materials.quantities, None, MATERIAL_FACTORS)
+        transport_kg = _weighted_sum(
+            array('d', [w * d for w, d in zip(transports.weights, transports.distances)]),
+            transports.mode_idx,
+            TRANSPORT_FACTORS
         )
+        waste_kg = _weighted_sum(wastes.quantities, wastes.treatment_idx, WASTE_FACTORS)
+        return material_kg + transport_kg + waste_kg
+    
+    def scope3_co2_vec(self,
+                       materials: MaterialBatch,
+                       transports: TransportBatch,
+                       wastes: WasteBatch) -> array:
+        """
+        Scope3 の CO2量（kg）を1本の配列にまとめて計算
+        
+        並びは Cat1（原材料）→ Cat4（輸送）→ Cat5（廃棄物）。
+        配列は事前確保し、カテゴリごとにスライス代入で埋める
+        """
+        n_mat, n_trans = len(materials), len(transports)
+        co2 = array('d', [0.0]) * (n_mat + n_trans + len(wastes))
+        co2[:n_mat] = self.materials_to_scope3_vec(materials)
+        co2[n_mat:n_mat + n_trans] = self.transports_to_scope3_vec(transports)
+        co2[n_mat + n_trans:] = self.wastes_to_scope3_vec(wastes)
+        return co2
+    
+    def scope3_from_vec(self,
+                        materials: List[MaterialInput],
+                        transports: List[TransportData],
+                        wastes: List[WasteOutput],
+                        co2: array,
+                        include_descriptions: bool = True) -> List[Scope3Emission]:
+        """scope3_co2_vec の結果から Scope3Emission を組み立てる（明細が必要な場合のみ）"""
+        # co2 はカテゴリ順に並ぶ。zip はレコードが尽きた時点で止まり values を余分に読まない
+        values = iter(co2)
+        return [
+            self._scope3_emission(category, record, co2_kg, include_descriptions)
+            for category, records in (("Cat1", materials), ("Cat4", transports), ("Cat5", wastes))
+            for record, co2_kg in zip(records, values)
+        ]
     
     # --- レポート生成 ---
     
@@ -308,14 +533,49 @@ class GHGCalculator:
                            period: str,
                            org: str) -> GHGReport:
         """全スコープを集約してレポート生成"""
-        scope3_total = sum(s.total_co2_ton for s in scope3_list)
-        total = scope1.total_co2_ton + scope2.total_co2_ton + scope3_total
+        return self.aggregate_to_report_precomputed(
+            scope1=scope1,
+            scope2=scope2,
+            scope3_total=sum(s.total_co2_ton for s in scope3_list),
+            scope3_details=self.scope3_details(scope3_list),
+            production_total=production_total,
+            period=period,
+            org=org
+        )
+    
+    def scope3_details(self, scope3_list: List[Scope3Emission]) -> List[Dict[str, Any]]:
+        """レポート明細用の Scope3 カテゴリ一覧"""
+        return [
+            {"category": s.category, "description": s.description, "ton": s.total_co2_ton}
+            for s in scope3_list
+        ]
+    
+    def aggregate_to_report_precomputed(self,
+                                        scope1: Scope1Emission,
+                                        scope2: Scope2Emission,
+                                        scope3_total: float,
+                                        scope3_details: List[Dict[str, Any]],
+                                        production_total: float,
+                                        period: str,
+                                        org: str,
+                                        total: Optional[float] = None) -> GHGReport:
+        """
+        集計済みの Scope3（合計 ton と明細）を使ってレポート生成
+        
+        Superposition 展開では Scope3 は全組み合わせで共通なので、
+        合計と明細は1回だけ計算して使い回す（明細リストは各レポートで共有される）。
+        total を渡せば合計はそれを使う（expand_superposition の totals 行列の値）
+        """
+        scope1_ton = scope1.total_co2_ton
+        scope2_ton = scope2.total_co2_ton
+        if total is None:
+            total = scope1_ton + scope2_ton + scope3_total
         
         return GHGReport(
             reporting_period=period,
             organization=org,
-            scope1_total_ton=scope1.total_co2_ton,
-            scope2_total_ton=scope2.total_co2_ton,
+            scope1_total_ton=scope1_ton,
+            scope2_total_ton=scope2_ton,
             scope3_total_ton=scope3_total,
             total_ton=total,
             intensity=total / production_total if production_total > 0 else 0,
@@ -327,10 +587,7 @@ class GHGCalculator:
                     "lpg_ton": scope1.lpg_co2_kg / 1000,
                 },
                 "scope2_method": scope2.method,
-                "scope3_categories": [
-                    {"category": s.category, "description": s.description, "ton": s.total_co2_ton}
-                    for s in scope3_list
-                ]
+                "scope3_categories": scope3_details
             }
         )
 
@@ -351,7 +608,7 @@ Scope3Data = Type("Scope3Data")
 GHGReportType = Type("GHGReport")
 
 
-@dataclass
+@dataclass(slots=True)
 class TypedTransform:
     """型付き変換関数"""
     name: str
@@ -371,9 +628,13 @@ class GHGPipelineBuilder:
     
     def __init__(self):
         self.transforms: List[TypedTransform] = []
+        self._path_index: Dict[Tuple[Type, Type], List[TypedTransform]] = {}
         self.calculator_moe = GHGCalculator(EmissionFactors.JAPAN_MOE)
         self.calculator_ghg = GHGCalculator(EmissionFactors.GHG_PROTOCOL)
         self._setup_transforms()
+        # 変換関数は構築後に変わらないので、Superposition の方法一覧も1回だけ求める
+        self._scope1_methods = self.find_paths(EnergyData, Scope1Data)
+        self._scope2_methods = self.find_paths(EnergyData, Scope2Data)
     
     def _setup_transforms(self):
         """変換関数を登録"""
@@ -436,19 +697,28 @@ class GHGPipelineBuilder:
             impl=self.calculator_moe.waste_to_scope3_cat5,
             description="Waste → Scope3 Cat5"
         ))
+        
+        # (入力型, 出力型) → 変換関数 の索引
+        for t in self.transforms:
+            self._path_index.setdefault((t.input_type, t.output_type), []).append(t)
     
     def find_paths(self, from_type: Type, to_type: Type) -> List[TypedTransform]:
         """指定された型間の変換パスを探索"""
-        return [t for t in self.transforms 
-                if t.input_type == from_type and t.output_type == to_type]
+        return list(self._path_index.get((from_type, to_type), ()))
     
     def get_all_scope1_methods(self) -> List[TypedTransform]:
-        """Scope1計算の全方法（Superposition的）"""
-        return self.find_paths(EnergyData, Scope1Data)
+        """Scope1計算の全方法（Superposition的）。共有リストなので変更しないこと"""
+        return self._scope1_methods
     
     def get_all_scope2_methods(self) -> List[TypedTransform]:
-        """Scope2計算の全方法（Superposition的）"""
-        return self.find_paths(EnergyData, Scope2Data)
+        """Scope2計算の全方法（Superposition的）。共有リストなので変更しないこと"""
+        return self._scope2_methods
+
+
+@lru_cache(maxsize=1)
+def _default_builder() -> GHGPipelineBuilder:
+    """既定のパイプラインビルダー（プロセス内で1つを共有）"""
+    return GHGPipelineBuilder()
 
 
 # =============================================================================
@@ -462,6 +732,8 @@ class ICGHGCompiler:
     
     def __init__(self, builder: GHGPipelineBuilder):
         self.builder = builder
+        # 変換関数は構築後に変わらないので、生成したIC項を保持して使い回す
+        self._pipeline_term: Optional[str] = None
     
     def compile_scope1_superposition(self) -> str:
         """
@@ -489,6 +761,11 @@ class ICGHGCompiler:
         """
         完全なGHG計算パイプラインをIC項として表現
         """
+        if self._pipeline_term is None:
+            self._pipeline_term = self._build_full_pipeline()
+        return self._pipeline_term
+    
+    def _build_full_pipeline(self) -> str:
         scope1_sup = self.compile_scope1_superposition()
         scope2_sup = self.compile_scope2_superposition()
         
@@ -525,7 +802,7 @@ class GHGReportGenerator:
     """
     
     def __init__(self):
-        self.builder = GHGPipelineBuilder()
+        self.builder = _default_builder()
     
     def generate_with_superposition(self,
                                     energy: EnergyConsumption,
@@ -534,58 +811,102 @@ class GHGReportGenerator:
                                     wastes: List[WasteOutput],
                                     production_total: float,
                                     period: str,
-                                    org: str) -> Dict[str, GHGReport]:
+                                    org: str,
+                                    include_scope3_details: bool = True) -> Dict[str, GHGReport]:
         """
         複数の計算方法でレポートを生成（Superposition）
         
+        include_scope3_details=False の場合は Scope3 の明細（Scope3Emission）を
+        組み立てず、合計のみを計算する
+        
         返り値: {"方法名": レポート} の辞書
         """
         results = {}
         
-        # Scope1: 2つの排出係数で計算
-        scope1_methods = self.builder.get_all_scope1_methods()
+        # Scope3: 各カテゴリをレコード列ごとに一括計算
+        calc = self.builder.calculator_moe
+        material_batch = MaterialBatch.from_records(materials)
+        transport_batch = TransportBatch.from_records(transports)
+        waste_batch = WasteBatch.from_records(wastes)
+        if include_scope3_details:
+            scope3_co2 = calc.scope3_co2_vec(material_batch, transport_batch, waste_batch)
+            scope3_total = sum(scope3_co2) / 1000
+            scope3_details = calc.scope3_details(
+                calc.scope3_from_vec(materials, transports, wastes, scope3_co2)
+            )
+        else:
+            scope3_total = calc.scope3_total_kg(material_batch, transport_batch, waste_batch) / 1000
+            scope3_details = []
         
-        # Scope2: Location-based と Market-based
-        scope2_methods = self.builder.get_all_scope2_methods()
+        # Scope1/Scope2 は方法ごとに1回だけ計算し、全組み合わせの合計を行列で展開
+        scope1_results, scope2_results, totals = self.expand_superposition(energy, scope3_total)
         
-        # Scope3: 各カテゴリで計算
-        calc = self.builder.calculator_moe
-        scope3_list = []
-        for mat in materials:
-            scope3_list.append(calc.material_to_scope3_cat1(mat))
-        for trans in transports:
-            scope3_list.append(calc.transport_to_scope3_cat4(trans))
-        for waste in wastes:
-            scope3_list.append(calc.waste_to_scope3_cat5(waste))
-        
-        # 全組み合わせを生成（Superposition展開）
-        for s1_method in scope1_methods:
-            scope1 = s1_method.impl(energy)
+        for (s1_method, scope1), row in zip(scope1_results, totals):
+            # 適切な calculator を選択
+            if "moe" in s1_method.name:
+                calc = self.builder.calculator_moe
+            else:
+                calc = self.builder.calculator_ghg
             
-            for s2_method in scope2_methods:
-                scope2 = s2_method.impl(energy)
-                
+            for (s2_method, scope2), total in zip(scope2_results, row):
                 method_name = f"{s1_method.name} + {s2_method.name}"
                 
-                # 適切な calculator を選択
-                if "moe" in s1_method.name:
-                    calc = self.builder.calculator_moe
-                else:
-                    calc = self.builder.calculator_ghg
-                
-                report = calc.aggregate_to_report(
+                report = calc.aggregate_to_report_precomputed(
                     scope1=scope1,
                     scope2=scope2,
-                    scope3_list=scope3_list,
+                    scope3_total=scope3_total,
+                    scope3_details=scope3_details,
                     production_total=production_total,
                     period=period,
-                    org=org
+                    org=org,
+                    total=total
                 )
                 report.calculation_method = method_name
                 results[method_name] = report
         
         return results
     
+    def expand_superposition(self, energy: EnergyConsumption, scope3_total: float):
+        """
+        Superposition の全組み合わせを合計排出量の行列として展開
+        
+        Scope1/Scope2 の結果は (energy, 係数セット) のみに依存するため、
+        各方法を1回ずつ評価し、合計は外和で求める:
+            totals[i][j] = scope1[i] + scope2[j] + scope3_total
+        
+        返り値: (Scope1の[(方法, 結果)], Scope2の[(方法, 結果)], totals)
+        """
+        scope1_results = [(m, m.impl(energy)) for m in self.builder.get_all_scope1_methods()]
+        scope2_results = [(m, m.impl(energy)) for m in self.builder.get_all_scope2_methods()]
+        
+        s1 = array('d', [scope1.total_co2_ton for _, scope1 in scope1_results])
+        s2 = array('d', [scope2.total_co2_ton for _, scope2 in scope2_results])
+        totals = _expand_totals(s1, s2, scope3_total)
+        return scope1_results, scope2_results, totals
+    
+    def superposition_extremes(self, reports: Dict[str, GHGReport]) -> Tuple[str, str]:
+        """
+        合計排出量が最小・最大となる計算方法名を返す
+        
+        generate_with_superposition の結果を1回だけ走査して求める。各レポートの
+        total_ton は totals 行列の値なので、行列の argmin / argmax と同じ
+        （同じ値なら先に現れた方法を選ぶ）
+        返り値: (最小の方法名, 最大の方法名)
+        """
+        if not reports:
+            raise ValueError("superposition_extremes() arg is an empty reports dict")
+        items = iter(reports.items())
+        lo, report = next(items)
+        hi = lo
+        lo_total = hi_total = report.total_ton
+        for name, report in items:
+            t = report.total_ton
+            if t < lo_total:
+                lo, lo_total = name, t
+            elif t > hi_total:
+                hi, hi_total = name, t
+        return lo, hi
+    
     def generate_with_duplication(self,
                                   energy: EnergyConsumption,
                                   production_total: float,
@@ -739,8 +1060,9 @@ def demo():
     print("=" * 70)
     
     # 最小・最大を比較
-    min_report = min(reports.values(), key=lambda r: r.total_ton)
-    max_report = max(reports.values(), key=lambda r: r.total_ton)
+    min_name, max_name = generator.superposition_extremes(reports)
+    min_report = reports[min_name]
+    max_report = reports[max_name]
     
     print(f"\n   最小排出量: {min_report.total_ton:.2f} ton-CO2 ({min_report.calculation_method})")
     print(f"   最大排出量: {max_report.total_ton:.2f} ton-CO2 ({max_report.calculation_method})")
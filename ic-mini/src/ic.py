@@ -8,10 +8,13 @@ Interaction Calculus Mini - シンプルな処理系
 - 数値と基本演算
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields, replace
 from typing import Union, Optional, Dict, List
 from abc import ABC, abstractmethod
+from functools import lru_cache
+import operator
 import re
+import sys
 
 
 # =============================================================================
@@ -20,79 +23,104 @@ import re
 
 class Term(ABC):
     """すべての項の基底クラス"""
-    @abstractmethod
+    # _fv / _fdp: free_vars / free_dps の計算結果のキャッシュ（初回参照時に設定）
+    __slots__ = ('_fv', '_fdp')
+    
     def __str__(self) -> str:
+        # 部分項の文字列を連結し直さないよう、断片を1つのリストに集めて最後に1回だけ join する
+        out: List[str] = []
+        self._emit(out)
+        return ''.join(out)
+    
+    @abstractmethod
+    def _emit(self, out: List[str]) -> None:
+        """文字列表現の断片を out に追加する"""
         pass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Var(Term):
     """変数: x"""
     name: str
     
-    def __str__(self) -> str:
-        return self.name
+    def _emit(self, out: List[str]) -> None:
+        out.append(self.name)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Dp0(Term):
     """複製変数の第1要素: x₀"""
     name: str
     
-    def __str__(self) -> str:
-        return f"{self.name}₀"
+    def _emit(self, out: List[str]) -> None:
+        out.append(self.name)
+        out.append("₀")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Dp1(Term):
     """複製変数の第2要素: x₁"""
     name: str
     
-    def __str__(self) -> str:
-        return f"{self.name}₁"
+    def _emit(self, out: List[str]) -> None:
+        out.append(self.name)
+        out.append("₁")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Num(Term):
     """数値リテラル"""
     value: int
     
-    def __str__(self) -> str:
-        return str(self.value)
+    def _emit(self, out: List[str]) -> None:
+        out.append(str(self.value))
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Lam(Term):
     """ラムダ抽象: λx.body"""
     var: str
     body: Term
     
-    def __str__(self) -> str:
-        return f"λ{self.var}.{self.body}"
+    def _emit(self, out: List[str]) -> None:
+        out.append("λ")
+        out.append(self.var)
+        out.append(".")
+        self.body._emit(out)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class App(Term):
     """関数適用: (f x)"""
     func: Term
     arg: Term
     
-    def __str__(self) -> str:
-        return f"({self.func} {self.arg})"
+    def _emit(self, out: List[str]) -> None:
+        out.append("(")
+        self.func._emit(out)
+        out.append(" ")
+        self.arg._emit(out)
+        out.append(")")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Sup(Term):
     """重ね合わせ: &L{a, b}"""
     label: str
     fst: Term
     snd: Term
     
-    def __str__(self) -> str:
-        return f"&{self.label}{{{self.fst}, {self.snd}}}"
+    def _emit(self, out: List[str]) -> None:
+        out.append("&")
+        out.append(self.label)
+        out.append("{")
+        self.fst._emit(out)
+        out.append(", ")
+        self.snd._emit(out)
+        out.append("}")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Dup(Term):
     """複製: ! x &L= v; t"""
     name: str
@@ -100,42 +128,163 @@ class Dup(Term):
     value: Term
     body: Term
     
-    def __str__(self) -> str:
-        return f"! {self.name} &{self.label}= {self.value}; {self.body}"
+    def _emit(self, out: List[str]) -> None:
+        out.append("! ")
+        out.append(self.name)
+        out.append(" &")
+        out.append(self.label)
+        out.append("= ")
+        self.value._emit(out)
+        out.append("; ")
+        self.body._emit(out)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Era(Term):
     """消去: &{}"""
-    def __str__(self) -> str:
-        return "&{}"
+    def _emit(self, out: List[str]) -> None:
+        out.append("&{}")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Op2(Term):
     """二項演算: (a + b)"""
     op: str
     left: Term
     right: Term
     
-    def __str__(self) -> str:
-        return f"({self.left} {self.op} {self.right})"
+    def _emit(self, out: List[str]) -> None:
+        out.append("(")
+        self.left._emit(out)
+        out.append(" ")
+        out.append(self.op)
+        out.append(" ")
+        self.right._emit(out)
+        out.append(")")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Pair(Term):
     """ペア（構造体）: (a, b)"""
     fst: Term
     snd: Term
     
-    def __str__(self) -> str:
-        return f"({self.fst}, {self.snd})"
+    def _emit(self, out: List[str]) -> None:
+        out.append("(")
+        self.fst._emit(out)
+        out.append(", ")
+        self.snd._emit(out)
+        out.append(")")
+
+
+# 不変な葉の共有インスタンス（簡約のたびに生成しない）
+_ERA = Era()
+
+
+@lru_cache(maxsize=1024)
+def _mknum(value: int) -> Num:
+    """数値リテラル（よく使う値はインスタンスを使い回す）"""
+    return Num(value)
+
+
+# =============================================================================
+# 自由変数
+# =============================================================================
+
+_EMPTY: frozenset = frozenset()
+
+
+def free_vars(term: Term) -> frozenset:
+    """項の自由変数（Var）の名前の集合。項は不変なので結果を項に保持する"""
+    try:
+        return term._fv
+    except AttributeError:
+        pass
+    if type(term) is Var:
+        fv = frozenset((term.name,))
+    elif type(term) is Lam:
+        fv = free_vars(term.body) - {term.var}
+    elif type(term) is App:
+        fv = free_vars(term.func) | free_vars(term.arg)
+    elif type(term) in (Sup, Pair):
+        fv = free_vars(term.fst) | free_vars(term.snd)
+    elif type(term) is Dup:
+        fv = free_vars(term.value) | free_vars(term.body)
+    elif type(term) is Op2:
+        fv = free_vars(term.left) | free_vars(term.right)
+    else:
+        fv = _EMPTY
+    object.__setattr__(term, '_fv', fv)
+    return fv
+
+
+def free_dps(term: Term) -> frozenset:
+    """項に現れる複製変数（Dp0/Dp1）の名前の集合。項は不変なので結果を項に保持する"""
+    try:
+        return term._fdp
+    except AttributeError:
+        pass
+    if type(term) in (Dp0, Dp1):
+        fdp = frozenset((term.name,))
+    elif type(term) is Lam:
+        fdp = free_dps(term.body)
+    elif type(term) is App:
+        fdp = free_dps(term.func) | free_dps(term.arg)
+    elif type(term) in (Sup, Pair):
+        fdp = free_dps(term.fst) | free_dps(term.snd)
+    elif type(term) is Dup:
+        fdp = free_dps(term.value) | free_dps(term.body)
+    elif type(term) is Op2:
+        fdp = free_dps(term.left) | free_dps(term.right)
+    else:
+        fdp = _EMPTY
+    object.__setattr__(term, '_fdp', fdp)
+    return fdp
+
+
+# =============================================================================
+# 走査
+# =============================================================================
+
+def _children(term: Term) -> tuple:
+    """直下の部分項（左から順に）"""
+    cls = type(term)
+    if cls is Lam:
+        return (term.body,)
+    if cls is App:
+        return (term.func, term.arg)
+    if cls is Sup or cls is Pair:
+        return (term.fst, term.snd)
+    if cls is Dup:
+        return (term.value, term.body)
+    if cls is Op2:
+        return (term.left, term.right)
+    return ()
 
 
 # =============================================================================
 # パーサー
 # =============================================================================
 
+# 二項演算子
+_OPS = frozenset('+-*/')
+
+# 字句パターン（文字単位のループの代わりに正規表現で一度に読む）
+_NUM_RE = re.compile(r'\d+')
+# 変数名: ASCII英数字と _（ただし _0 / _1 の _ は添字なので含めない）
+_VAR_RE = re.compile(r'(?:[A-Za-z0-9]|_(?![01]))*')
+# 束縛変数名・ラベル: 英数字と _
+_IDENT_RE = re.compile(r'\w*')
+# 項の先頭トークン: 直前の空白ごと1回の照合で種類を判定する
+# （ASCII 以外の文字は OTHER として str の文字種判定に回す）
+_TERM_START_RE = re.compile(
+    r'[ \t\n\r]*(?:'
+    r'(?P<ERA>&\{\})|(?P<SUP>&)|(?P<DUP>!)|(?P<LAM>[λ\\])|(?P<PAREN>\()'
+    r'|(?P<NUM>[0-9])|(?P<VAR>[A-Za-z_])|(?P<OTHER>.)'
+    r')'
+)
+
+
 class ParseError(Exception):
     """パースエラー"""
     pass
@@ -159,103 +308,102 @@ class Parser:
         op2  ::= "(" term op term ")"
         pair ::= "(" term "," term ")"
         op   ::= "+" | "-" | "*" | "/"
+    
+    変数名・ラベルは sys.intern した文字列で保持する（評価器での名前の比較が参照の一致で済む）
     """
     
     def __init__(self, text: str):
         self.text = text
         self.pos = 0
+        self.end = len(text)
     
     def parse(self) -> Term:
         self.skip_whitespace()
         term = self.parse_term()
         self.skip_whitespace()
-        if self.pos < len(self.text):
+        if self.pos < self.end:
             raise ParseError(f"Unexpected character at position {self.pos}: '{self.text[self.pos]}'")
         return term
     
     def skip_whitespace(self):
-        while self.pos < len(self.text) and self.text[self.pos] in ' \t\n\r':
+        while self.pos < self.end and self.text[self.pos] in ' \t\n\r':
             self.pos += 1
     
     def peek(self) -> Optional[str]:
-        if self.pos < len(self.text):
+        if self.pos < self.end:
             return self.text[self.pos]
         return None
     
-    def peek_ahead(self, n: int = 1) -> str:
-        return self.text[self.pos:self.pos + n]
-    
     def consume(self, expected: str):
-        if self.text[self.pos:self.pos + len(expected)] != expected:
+        if not self.text.startswith(expected, self.pos):
             raise ParseError(f"Expected '{expected}' at position {self.pos}")
         self.pos += len(expected)
         self.skip_whitespace()
     
     def parse_term(self) -> Term:
-        self.skip_whitespace()
-        c = self.peek()
-        
-        if c is None:
+        m = _TERM_START_RE.match(self.text, self.pos)
+        if m is None:
+            self.pos = self.end
             raise ParseError("Unexpected end of input")
+        kind = m.lastgroup
+        self.pos = m.start(kind)
         
         # 消去: &{}
-        if self.peek_ahead(3) == "&{}":
-            self.consume("&{}")
-            return Era()
+        if kind == 'ERA':
+            self.pos += 3
+            self.skip_whitespace()
+            return _ERA
         
         # 重ね合わせ: &L{a, b}
-        if c == '&':
+        if kind == 'SUP':
             return self.parse_sup()
         
         # 複製: ! x &L= v; t
-        if c == '!':
+        if kind == 'DUP':
             return self.parse_dup()
         
         # ラムダ: λx.body or \x.body
-        if c == 'λ' or c == '\\':
+        if kind == 'LAM':
             return self.parse_lam()
         
         # 括弧で始まる: App, Op2, Pair
-        if c == '(':
+        if kind == 'PAREN':
             return self.parse_paren()
         
         # 数値
-        if c.isdigit():
+        if kind == 'NUM':
             return self.parse_num()
         
         # 変数（Dp0, Dp1を含む）
-        if c.isalpha() or c == '_':
+        if kind == 'VAR':
+            return self.parse_var()
+        
+        # ASCII 以外の文字
+        c = m.group(kind)
+        if c.isdigit():
+            return self.parse_num()
+        if c.isalpha():
             return self.parse_var()
         
         raise ParseError(f"Unexpected character '{c}' at position {self.pos}")
     
     def parse_num(self) -> Num:
-        start = self.pos
-        while self.pos < len(self.text) and self.text[self.pos].isdigit():
-            self.pos += 1
-        value = int(self.text[start:self.pos])
+        m = _NUM_RE.match(self.text, self.pos)
+        if m is None:
+            raise ParseError(f"Unexpected character '{self.text[self.pos]}' at position {self.pos}")
+        self.pos = m.end()
+        value = int(m.group())
         self.skip_whitespace()
-        return Num(value)
+        return _mknum(value)
     
     def parse_var(self) -> Union[Var, Dp0, Dp1]:
-        start = self.pos
-        # 通常のASCII英数字のみを変数名として扱う（ただし_で終わる場合は特殊処理）
-        while self.pos < len(self.text):
-            c = self.text[self.pos]
-            if c.isascii() and (c.isalnum() or c == '_'):
-                # _0 や _1 で終わる場合はDp0/Dp1として処理したいので
-                # _の後に0か1が来る場合は変数名に含めない
-                if c == '_' and self.pos + 1 < len(self.text):
-                    next_c = self.text[self.pos + 1]
-                    if next_c == '0' or next_c == '1':
-                        break
-                self.pos += 1
-            else:
-                break
-        name = self.text[start:self.pos]
+        # 通常のASCII英数字のみを変数名として扱う（_0 / _1 はDp0/Dp1の添字）
+        m = _VAR_RE.match(self.text, self.pos)
+        self.pos = m.end()
+        name = sys.intern(m.group())
         
         # 添字チェック: ₀, ₁, _0, _1
-        if self.pos < len(self.text):
+        if self.pos < self.end:
             if self.text[self.pos] == '₀':
                 self.pos += 1
                 self.skip_whitespace()
@@ -264,11 +412,11 @@ class Parser:
                 self.pos += 1
                 self.skip_whitespace()
                 return Dp1(name)
-            elif self.peek_ahead(2) == '_0':
+            elif self.text.startswith('_0', self.pos):
                 self.pos += 2
                 self.skip_whitespace()
                 return Dp0(name)
-            elif self.peek_ahead(2) == '_1':
+            elif self.text.startswith('_1', self.pos):
                 self.pos += 2
                 self.skip_whitespace()
                 return Dp1(name)
@@ -283,10 +431,9 @@ class Parser:
             self.consume('\\')
         
         # 変数名
-        start = self.pos
-        while self.pos < len(self.text) and (self.text[self.pos].isalnum() or self.text[self.pos] == '_'):
-            self.pos += 1
-        var = self.text[start:self.pos]
+        m = _IDENT_RE.match(self.text, self.pos)
+        self.pos = m.end()
+        var = sys.intern(m.group())
         self.skip_whitespace()
         
         self.consume('.')
@@ -297,10 +444,9 @@ class Parser:
         self.consume('&')
         
         # ラベル（オプション）
-        label = ""
-        while self.pos < len(self.text) and (self.text[self.pos].isalnum() or self.text[self.pos] == '_'):
-            label += self.text[self.pos]
-            self.pos += 1
+        m = _IDENT_RE.match(self.text, self.pos)
+        self.pos = m.end()
+        label = sys.intern(m.group())
         if not label:
             label = "L"  # デフォルトラベル
         self.skip_whitespace()
@@ -316,19 +462,17 @@ class Parser:
         self.consume('!')
         
         # 変数名
-        start = self.pos
-        while self.pos < len(self.text) and (self.text[self.pos].isalnum() or self.text[self.pos] == '_'):
-            self.pos += 1
-        name = self.text[start:self.pos]
+        m = _IDENT_RE.match(self.text, self.pos)
+        self.pos = m.end()
+        name = sys.intern(m.group())
         self.skip_whitespace()
         
         self.consume('&')
         
         # ラベル
-        label = ""
-        while self.pos < len(self.text) and (self.text[self.pos].isalnum() or self.text[self.pos] == '_'):
-            label += self.text[self.pos]
-            self.pos += 1
+        m = _IDENT_RE.match(self.text, self.pos)
+        self.pos = m.end()
+        label = sys.intern(m.group())
         if not label:
             label = "L"
         self.skip_whitespace()
@@ -351,14 +495,10 @@ class Parser:
             return Pair(first, second)
         
         # 演算子があればOp2
-        op = None
-        for operator in ['+', '-', '*', '/']:
-            if self.peek() == operator:
-                op = operator
-                self.consume(operator)
-                break
-        
-        if op:
+        op = self.peek()
+        if op in _OPS:
+            self.pos += 1
+            self.skip_whitespace()
             right = self.parse_term()
             self.consume(')')
             return Op2(op, first, right)
@@ -369,8 +509,13 @@ class Parser:
         return App(first, second)
 
 
+@lru_cache(maxsize=256)
 def parse(text: str) -> Term:
-    """文字列をパースしてASTを返す"""
+    """
+    文字列をパースしてASTを返す
+    
+    項は不変なので、同じ文字列のパース結果はキャッシュして共有する
+    """
     return Parser(text).parse()
 
 
@@ -378,6 +523,26 @@ def parse(text: str) -> Term:
 # 評価器 (Reducer)
 # =============================================================================
 
+def _div(a: int, b: int) -> int:
+    """整数除算（0除算は0）"""
+    return a // b if b != 0 else 0
+
+
+# 演算子 → 演算関数（OP2-NUM で毎回の文字列比較の連鎖を避ける）
+_OP_FUNCS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': _div,
+}
+
+
+# 評価ステップ数の上限。PyPy ではトレーシング JIT により同じ時間で
+# 桁違いに多くのステップを回せるので、CLI/REPL はより大きい上限を使う
+DEFAULT_MAX_STEPS = 10_000
+PYPY_MAX_STEPS = 1_000_000
+
+
 class Evaluator:
     """
     Interaction Calculus の評価器
@@ -391,76 +556,89 @@ class Evaluator:
     - OP2-NUM: (a + b) → a + b
     """
     
-    def __init__(self, debug: bool = False):
+    def __init__(self, debug: bool = False, max_steps: int = DEFAULT_MAX_STEPS):
         self.debug = debug
         self.fresh_counter = 0
         self.steps = 0
-        self.max_steps = 10000
+        self.max_steps = max_steps
+        # 項の型 → 簡約関数（Num, Var, Dp0, Dp1, Era は既に正規形なので登録しない）
+        self._reduce_rules = {
+            App: self.reduce_app,
+            Dup: self.reduce_dup,
+            Lam: self.reduce_lam,
+            Sup: self.reduce_sup,
+            Op2: self.reduce_op2,
+            Pair: self.reduce_pair,
+        }
     
     def fresh_name(self, prefix: str = "v") -> str:
         """新しい一意な変数名を生成"""
         self.fresh_counter += 1
-        return f"${prefix}{self.fresh_counter}"
+        return sys.intern(f"${prefix}{self.fresh_counter}")
     
-    def log(self, msg: str):
+    def log(self, msg: str, *args):
+        """デバッグ出力。項の文字列化は debug が有効なときだけ行う（msg.format(*args)）"""
         if self.debug:
+            if args:
+                msg = msg.format(*args)
             print(f"[Step {self.steps}] {msg}")
     
     def evaluate(self, term: Term) -> Term:
         """項を正規形まで簡約"""
         self.steps = 0
-        prev = None
-        while str(term) != str(prev) and self.steps < self.max_steps:
+        while self.steps < self.max_steps:
             prev = term
             term = self.reduce(term)
             self.steps += 1
+            # 書き換えが無ければ同じオブジェクト。自己再生する項（ω など）は構造の一致で止める
+            if term is prev or term == prev:
+                break
         return term
     
     def reduce(self, term: Term) -> Term:
-        """1ステップ簡約を試みる"""
-        
-        # Num, Var, Era は既に正規形
-        if isinstance(term, (Num, Var, Dp0, Dp1, Era)):
+        """
+        1ステップ簡約を試みる
+        
+        何も書き換わらなかった部分項は同じオブジェクトのまま返す
+        （`result is term` なら正規形）
+        """
+        rule = self._reduce_rules.get(type(term))
+        if rule is None:
             return term
-        
-        # App
-        if isinstance(term, App):
-            return self.reduce_app(term)
-        
-        # Dup
-        if isinstance(term, Dup):
-            return self.reduce_dup(term)
-        
-        # Lam
-        if isinstance(term, Lam):
-            return Lam(term.var, self.reduce(term.body))
-        
-        # Sup
-        if isinstance(term, Sup):
-            return Sup(term.label, self.reduce(term.fst), self.reduce(term.snd))
-        
-        # Op2
-        if isinstance(term, Op2):
-            return self.reduce_op2(term)
-        
-        # Pair
-        if isinstance(term, Pair):
-            return Pair(self.reduce(term.fst), self.reduce(term.snd))
-        
-        return term
+        return rule(term)
+    
+    def reduce_lam(self, lam: Lam) -> Term:
+        body = self.reduce(lam.body)
+        if body is lam.body:
+            return lam
+        return Lam(lam.var, body)
+    
+    def reduce_sup(self, sup: Sup) -> Term:
+        fst = self.reduce(sup.fst)
+        snd = self.reduce(sup.snd)
+        if fst is sup.fst and snd is sup.snd:
+            return sup
+        return Sup(sup.label, fst, snd)
+    
+    def reduce_pair(self, pair: Pair) -> Term:
+        fst = self.reduce(pair.fst)
+        snd = self.reduce(pair.snd)
+        if fst is pair.fst and snd is pair.snd:
+            return pair
+        return Pair(fst, snd)
     
     def reduce_app(self, app: App) -> Term:
         func = self.reduce(app.func)
         arg = app.arg
         
         # APP-LAM: (λx.body arg) → body[x ← arg]
-        if isinstance(func, Lam):
-            self.log(f"APP-LAM: ({func} {arg})")
+        if type(func) is Lam:
+            self.log("APP-LAM: ({} {})", func, arg)
             return self.substitute(func.body, func.var, arg)
         
         # APP-SUP: (&L{a,b} c) → ! x &L= c; &L{(a x₀), (b x₁)}
-        if isinstance(func, Sup):
-            self.log(f"APP-SUP: ({func} {arg})")
+        if type(func) is Sup:
+            self.log("APP-SUP: ({} {})", func, arg)
             x = self.fresh_name("x")
             return Dup(
                 x, func.label, arg,
@@ -468,45 +646,42 @@ class Evaluator:
             )
         
         # APP-ERA: (&{} a) → &{}
-        if isinstance(func, Era):
-            self.log(f"APP-ERA: ({func} {arg})")
-            return Era()
-        
-        return App(func, self.reduce(arg))
+        if type(func) is Era:
+            self.log("APP-ERA: ({} {})", func, arg)
+            return _ERA
+        
+        arg = self.reduce(arg)
+        if func is app.func and arg is app.arg:
+            return app
+        return App(func, arg)
     
     def reduce_dup(self, dup: Dup) -> Term:
         value = self.reduce(dup.value)
         
-        # まずbodyにDp0/Dp1が含まれているか確認
-        has_dp0 = self.contains_dp(dup.body, dup.name, 0)
-        has_dp1 = self.contains_dp(dup.body, dup.name, 1)
-        
+        # bodyにDp0/Dp1が含まれているか確認（1回の走査で両方を調べる）
         # どちらも使われていなければbodyを返す
-        if not has_dp0 and not has_dp1:
-            self.log(f"DUP-UNUSED: {dup}")
+        if not self.dp_mask(dup.body, dup.name):
+            self.log("DUP-UNUSED: {}", dup)
             return self.reduce(dup.body)
         
         # DUP-NUM: ! x &L= n; t → t[x₀←n, x₁←n]
-        if isinstance(value, Num):
-            self.log(f"DUP-NUM: {dup}")
-            result = self.substitute_dp(dup.body, dup.name, value, value)
-            return self.reduce(result)
+        if type(value) is Num:
+            self.log("DUP-NUM: {}", dup)
+            return self.substitute_dp_and_reduce(dup.body, dup.name, value, value)
         
         # DUP-ERA: ! x &L= &{}; t → t[x₀←&{}, x₁←&{}]
-        if isinstance(value, Era):
-            self.log(f"DUP-ERA: {dup}")
-            result = self.substitute_dp(dup.body, dup.name, Era(), Era())
-            return self.reduce(result)
+        if type(value) is Era:
+            self.log("DUP-ERA: {}", dup)
+            return self.substitute_dp_and_reduce(dup.body, dup.name, _ERA, _ERA)
         
         # DUP-SUP (同じラベル): ! x &L= &L{a,b}; t → t[x₀←a, x₁←b]
-        if isinstance(value, Sup) and value.label == dup.label:
-            self.log(f"DUP-SUP (annihilate): {dup}")
-            result = self.substitute_dp(dup.body, dup.name, value.fst, value.snd)
-            return self.reduce(result)
+        if type(value) is Sup and value.label == dup.label:
+            self.log("DUP-SUP (annihilate): {}", dup)
+            return self.substitute_dp_and_reduce(dup.body, dup.name, value.fst, value.snd)
         
-        # DUP-SUP (異なるラベル): コミュート
-        if isinstance(value, Sup) and value.label != dup.label:
-            self.log(f"DUP-SUP (commute): {dup}")
+        # DUP-SUP (異なるラベル): コミュート（同じラベルの場合は上で処理済み）
+        if type(value) is Sup:
+            self.log("DUP-SUP (commute): {}", dup)
             a_name = self.fresh_name("a")
             b_name = self.fresh_name("b")
             result = Dup(
@@ -523,8 +698,8 @@ class Evaluator:
             return self.reduce(result)
         
         # DUP-LAM: ! f &L= λx.body; t → ...
-        if isinstance(value, Lam):
-            self.log(f"DUP-LAM: {dup}")
+        if type(value) is Lam:
+            self.log("DUP-LAM: {}", dup)
             x0 = self.fresh_name("x")
             x1 = self.fresh_name("x")
             b_name = self.fresh_name("b")
@@ -544,8 +719,8 @@ class Evaluator:
             return self.reduce(result)
         
         # DUP-PAIR: ! x &L= (a,b); t → ...
-        if isinstance(value, Pair):
-            self.log(f"DUP-PAIR: {dup}")
+        if type(value) is Pair:
+            self.log("DUP-PAIR: {}", dup)
             a_name = self.fresh_name("a")
             b_name = self.fresh_name("b")
             result = Dup(
@@ -562,51 +737,54 @@ class Evaluator:
             return self.reduce(result)
         
         # valueがまだ簡約可能な場合
-        if str(value) != str(dup.value):
+        if value is not dup.value:
             return Dup(dup.name, dup.label, value, dup.body)
         
         # bodyを簡約してみる
         new_body = self.reduce(dup.body)
-        if str(new_body) != str(dup.body):
+        if new_body is not dup.body:
             return Dup(dup.name, dup.label, value, new_body)
         
-        return Dup(dup.name, dup.label, value, new_body)
+        return dup
+    
+    def dp_mask(self, term: Term, name: str, mask: int = 0) -> int:
+        """
+        項に含まれる name₀ / name₁ をビットマスクで返す（bit0: name₀, bit1: name₁）
+        
+        両方見つかった時点、または name が現れない部分項で走査を打ち切る
+        """
+        stack = [term]
+        while stack and mask != 3:
+            t = stack.pop()
+            if name not in free_dps(t):
+                continue
+            cls = type(t)
+            if cls is Dp0:
+                mask |= 1
+            elif cls is Dp1:
+                mask |= 2
+            else:
+                stack.extend(_children(t))
+        return mask
     
     def contains_dp(self, term: Term, name: str, idx: int) -> bool:
         """項にname₀またはname₁が含まれているか確認"""
-        if isinstance(term, Dp0):
-            return term.name == name and idx == 0
-        if isinstance(term, Dp1):
-            return term.name == name and idx == 1
-        if isinstance(term, (Var, Num, Era)):
-            return False
-        if isinstance(term, Lam):
-            return self.contains_dp(term.body, name, idx)
-        if isinstance(term, App):
-            return self.contains_dp(term.func, name, idx) or self.contains_dp(term.arg, name, idx)
-        if isinstance(term, Sup):
-            return self.contains_dp(term.fst, name, idx) or self.contains_dp(term.snd, name, idx)
-        if isinstance(term, Dup):
-            return self.contains_dp(term.value, name, idx) or self.contains_dp(term.body, name, idx)
-        if isinstance(term, Op2):
-            return self.contains_dp(term.left, name, idx) or self.contains_dp(term.right, name, idx)
-        if isinstance(term, Pair):
-            return self.contains_dp(term.fst, name, idx) or self.contains_dp(term.snd, name, idx)
-        return False
+        bit = 1 if idx == 0 else 2 if idx == 1 else 0
+        return bool(self.dp_mask(term, name) & bit)
     
     def reduce_op2(self, op2: Op2) -> Term:
         left = self.reduce(op2.left)
         right = self.reduce(op2.right)
         
         # OP2-NUM: (#a + #b) → #(a + b)
-        if isinstance(left, Num) and isinstance(right, Num):
-            self.log(f"OP2-NUM: ({left} {op2.op} {right})")
+        if type(left) is Num and type(right) is Num:
+            self.log("OP2-NUM: ({} {} {})", left, op2.op, right)
             result = self.compute_op(op2.op, left.value, right.value)
-            return Num(result)
+            return _mknum(result)
         
         # OP2-SUP-L: (&L{a,b} + y) → ! Y &L= y; &L{(a + Y₀), (b + Y₁)}
-        if isinstance(left, Sup):
-            self.log(f"OP2-SUP-L: {op2}")
+        if type(left) is Sup:
+            self.log("OP2-SUP-L: {}", op2)
             y = self.fresh_name("y")
             return Dup(
                 y, left.label, right,
@@ -614,71 +792,58 @@ class Evaluator:
             )
         
         # OP2-SUP-R: (#n + &L{a,b}) → &L{(#n + a), (#n + b)}
-        if isinstance(right, Sup):
-            self.log(f"OP2-SUP-R: {op2}")
+        if type(right) is Sup:
+            self.log("OP2-SUP-R: {}", op2)
             return Sup(right.label, Op2(op2.op, left, right.fst), Op2(op2.op, left, right.snd))
         
         # OP2-ERA-L: (&{} + y) → &{}
-        if isinstance(left, Era):
-            self.log(f"OP2-ERA-L: {op2}")
-            return Era()
+        if type(left) is Era:
+            self.log("OP2-ERA-L: {}", op2)
+            return _ERA
         
         # OP2-ERA-R: (x + &{}) → &{}
-        if isinstance(right, Era):
-            self.log(f"OP2-ERA-R: {op2}")
-            return Era()
+        if type(right) is Era:
+            self.log("OP2-ERA-R: {}", op2)
+            return _ERA
         
+        if left is op2.left and right is op2.right:
+            return op2
         return Op2(op2.op, left, right)
     
     def compute_op(self, op: str, a: int, b: int) -> int:
         """演算を実行"""
-        if op == '+':
-            return a + b
-        elif op == '-':
-            return a - b
-        elif op == '*':
-            return a * b
-        elif op == '/':
-            return a // b if b != 0 else 0
-        else:
+        func = _OP_FUNCS.get(op)
+        if func is None:
             raise ValueError(f"Unknown operator: {op}")
+        return func(a, b)
     
     def substitute(self, term: Term, var: str, value: Term) -> Term:
         """term内のvarをvalueで置換"""
-        if isinstance(term, Var):
-            return value if term.name == var else term
-        
-        if isinstance(term, Dp0):
-            return term
-        
-        if isinstance(term, Dp1):
+        # varが自由に現れない部分項はそのまま共有する
+        if var not in free_vars(term):
             return term
         
-        if isinstance(term, Num):
-            return term
-        
-        if isinstance(term, Era):
-            return term
+        # ここに来るVarはvarそのもの。varを束縛するLamはvarを自由に含まない
+        if type(term) is Var:
+            return value
         
-        if isinstance(term, Lam):
-            if term.var == var:
-                return term  # シャドウイング
+        if type(term) is Lam:
             return Lam(term.var, self.substitute(term.body, var, value))
         
-        if isinstance(term, App):
+        if type(term) is App:
             return App(
                 self.substitute(term.func, var, value),
                 self.substitute(term.arg, var, value)
             )
         
-        if isinstance(term, Sup):
+        if type(term) is Sup:
             return Sup(
                 term.label,
                 self.substitute(term.fst, var, value),
                 self.substitute(term.snd, var, value)
             )
         
-        if isinstance(term, Dup):
+        if type(term) is Dup:
             return Dup(
                 term.name,
                 term.label,
@@ -686,14 +851,14 @@ class Evaluator:
                 self.substitute(term.body, var, value)
             )
         
-        if isinstance(term, Op2):
+        if type(term) is Op2:
             return Op2(
                 term.op,
                 self.substitute(term.left, var, value),
                 self.substitute(term.right, var, value)
             )
         
-        if isinstance(term, Pair):
+        if type(term) is Pair:
             return Pair(
                 self.substitute(term.fst, var, value),
                 self.substitute(term.snd, var, value)
@@ -701,34 +866,71 @@ class Evaluator:
         
         return term
     
+    def substitute_dp_and_reduce(self, term: Term, name: str, val0: Term, val1: Term) -> Term:
+        """
+        reduce(substitute_dp(term, ...)) を1回の走査で行う
+        
+        Lam/Sup/Pair は置換と簡約を同時に進めて中間の木を作らない。
+        簡約規則が置換前の部分項を参照する App/Dup/Op2 は従来どおり置換してから簡約する
+        """
+        if name not in free_dps(term):
+            return self.reduce(term)
+        
+        # ここに来るDp0/Dp1はnameそのもの
+        if type(term) is Dp0:
+            return self.reduce(val0)
+        
+        if type(term) is Dp1:
+            return self.reduce(val1)
+        
+        if type(term) is Lam:
+            return Lam(term.var, self.substitute_dp_and_reduce(term.body, name, val0, val1))
+        
+        if type(term) is Sup:
+            return Sup(
+                term.label,
+                self.substitute_dp_and_reduce(term.fst, name, val0, val1),
+                self.substitute_dp_and_reduce(term.snd, name, val0, val1)
+            )
+        
+        if type(term) is Pair:
+            return Pair(
+                self.substitute_dp_and_reduce(term.fst, name, val0, val1),
+                self.substitute_dp_and_reduce(term.snd, name, val0, val1)
+            )
+        
+        return self.reduce(self.substitute_dp(term, name, val0, val1))
+    
     def substitute_dp(self, term: Term, name: str, val0: Term, val1: Term) -> Term:
         """term内のname₀をval0、name₁をval1で置換"""
-        if isinstance(term, Dp0):
-            return val0 if term.name == name else term
+        # name₀/name₁が現れない部分項はそのまま共有する
+        if name not in free_dps(term):
+            return term
         
-        if isinstance(term, Dp1):
-            return val1 if term.name == name else term
+        # ここに来るDp0/Dp1はnameそのもの
+        if type(term) is Dp0:
+            return val0
         
-        if isinstance(term, (Var, Num, Era)):
-            return term
+        if type(term) is Dp1:
+            return val1
         
-        if isinstance(term, Lam):
+        if type(term) is Lam:
             return Lam(term.var, self.substitute_dp(term.body, name, val0, val1))
         
-        if isinstance(term, App):
+        if type(term) is App:
             return App(
                 self.substitute_dp(term.func, name, val0, val1),
                 self.substitute_dp(term.arg, name, val0, val1)
             )
         
-        if isinstance(term, Sup):
+        if type(term) is Sup:
             return Sup(
                 term.label,
                 self.substitute_dp(term.fst, name, val0, val1),
                 self.substitute_dp(term.snd, name, val0, val1)
             )
         
-        if isinstance(term, Dup):
+        if type(term) is Dup:
             return Dup(
                 term.name,
                 term.label,
@@ -736,14 +938,14 @@ class Evaluator:
                 self.substitute_dp(term.body, name, val0, val1)
             )
         
-        if isinstance(term, Op2):
+        if type(term) is Op2:
             return Op2(
                 term.op,
                 self.substitute_dp(term.left, name, val0, val1),
                 self.substitute_dp(term.right, name, val0, val1)
             )
         
-        if isinstance(term, Pair):
+        if type(term) is Pair:
             return Pair(
                 self.substitute_dp(term.fst, name, val0, val1),
                 self.substitute_dp(term.snd, name, val0, val1)
@@ -752,10 +954,11 @@ class Evaluator:
         return term
 
 
-def evaluate(text: str, debug: bool = False) -> Term:
+def evaluate(text: str, debug: bool = False,
+             max_steps: int = DEFAULT_MAX_STEPS) -> Term:
     """文字列をパースして評価"""
     term = parse(text)
-    evaluator = Evaluator(debug=debug)
+    evaluator = Evaluator(debug=debug, max_steps=max_steps)
     return evaluator.evaluate(term)
 
 
@@ -763,7 +966,46 @@ def evaluate(text: str, debug: bool = False) -> Term:
 # REPL
 # =============================================================================
 
-def repl():
+# これより大きい結果は全体を文字列化せず、先頭部分だけを表示する
+REPL_MAX_NODES = 10_000
+REPL_PREVIEW_NODES = 200
+
+_ELLIPSIS = Var("...")
+
+
+def term_size(term: Term) -> int:
+    """項のノード数"""
+    size = 0
+    stack = [term]
+    while stack:
+        t = stack.pop()
+        size += 1
+        stack.extend(_children(t))
+    return size
+
+
+def _truncate(term: Term, budget: List[int]) -> Term:
+    """先行順で budget[0] 個までのノードを残し、残りの部分項を ... に置き換えた項"""
+    budget[0] -= 1
+    children = {}
+    for f in fields(term):
+        child = getattr(term, f.name)
+        if isinstance(child, Term):
+            children[f.name] = _truncate(child, budget) if budget[0] > 0 else _ELLIPSIS
+    return replace(term, **children) if children else term
+
+
+def format_result(term: Term,
+                  max_nodes: int = REPL_MAX_NODES,
+                  preview_nodes: int = REPL_PREVIEW_NODES) -> str:
+    """REPL 表示用の文字列（max_nodes を超える項は先頭 preview_nodes 個だけ表示）"""
+    size = term_size(term)
+    if size <= max_nodes:
+        return str(term)
+    return f"{_truncate(term, [preview_nodes])} ({size} nodes, truncated)"
+
+
+def repl(max_steps: int = DEFAULT_MAX_STEPS):
     """対話型REPL"""
     print("Interaction Calculus Mini REPL")
     print("Commands: :q (quit), :d (toggle debug), :h (help)")
@@ -791,8 +1033,8 @@ def repl():
             continue
         
         try:
-            result = evaluate(line, debug=debug)
-            print(f"=> {result}")
+            result = evaluate(line, debug=debug, max_steps=max_steps)
+            print(f"=> {format_result(result)}")
         except Exception as e:
             print(f"Error: {e}")
 
@@ -824,13 +1066,19 @@ Examples:
 # =============================================================================
 
 if __name__ == "__main__":
-    import sys
-    
+    import platform
+
+    # 評価器はオブジェクトグラフ操作だけの純 Python なので PyPy で速く動く
+    if platform.python_implementation() == 'PyPy':
+        max_steps = PYPY_MAX_STEPS
+    else:
+        max_steps = DEFAULT_MAX_STEPS
+
     if len(sys.argv) > 1:
         # コマンドライン引数があればそれを評価
         code = ' '.join(sys.argv[1:])
-        result = evaluate(code)
+        result = evaluate(code, max_steps=max_steps)
         print(result)
     else:
         # REPLを起動
-        repl()
+        repl(max_steps)
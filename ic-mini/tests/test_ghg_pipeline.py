@@ -0,0 +1,222 @@
+"""
+GHG パイプライン - テストスイート
+
+テストカテゴリ:
+1. 列指向バッチ（MaterialBatch / TransportBatch / WasteBatch）
+2. Scope3 の一括計算とレコードごとの計算の一致
+3. Superposition 展開（totals 行列・レポート・最小/最大）
+"""
+
+import unittest
+import sys
+import os
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_here, '..', 'src'))
+sys.path.insert(0, os.path.join(_here, '..'))
+
+from ghg_pipeline import (
+    EnergyConsumption, MaterialInput, TransportData, WasteOutput,
+    MaterialBatch, TransportBatch, WasteBatch,
+    GHGCalculator, GHGReportGenerator, EmissionFactors,
+    TRANSPORT_FACTORS, WASTE_FACTORS
+)
+
+
+def sample_inputs():
+    """デモと同じ入力（未知の輸送モード・処理方法を1件ずつ追加）"""
+    energy = EnergyConsumption(
+        electricity_kwh=150000,
+        natural_gas_m3=5000,
+        heavy_oil_l=2000,
+        lpg_kg=500,
+        period="2024-01"
+    )
+    materials = [
+        MaterialInput("M001", "鋼材", 10000, "kg", "SupplierA", 200),
+        MaterialInput("M002", "プラスチック原料", 5000, "kg", "SupplierB", 500),
+    ]
+    transports = [
+        TransportData("truck", 300, 5),
+        TransportData("ship", 1000, 20),
+        TransportData("drone", 12.5, 0.2),
+    ]
+    wastes = [
+        WasteOutput("industrial", 1000, "recycling"),
+        WasteOutput("general", 500, "incineration"),
+        WasteOutput("other", 30, "compost"),
+    ]
+    return energy, materials, transports, wastes
+
+
+class TestBatches(unittest.TestCase):
+    """列指向バッチのテスト"""
+    
+    def setUp(self):
+        _, self.materials, self.transports, self.wastes = sample_inputs()
+    
+    def test_material_batch(self):
+        """原材料バッチはレコードの並びのまま列に分解される"""
+        batch = MaterialBatch.from_records(self.materials)
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(list(batch.quantities), [10000, 5000])
+        self.assertEqual(list(batch.transport_distances), [200, 500])
+    
+    def test_transport_batch(self):
+        """未知の輸送モードは末尾のデフォルト係数を指す"""
+        batch = TransportBatch.from_records(self.transports)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(list(batch.distances), [300, 1000, 12.5])
+        self.assertEqual(list(batch.weights), [5, 20, 0.2])
+        self.assertEqual(TRANSPORT_FACTORS[batch.mode_idx[0]],
+                         EmissionFactors.TRANSPORT["truck"])
+        self.assertEqual(batch.mode_idx[2], len(TRANSPORT_FACTORS) - 1)
+    
+    def test_waste_batch(self):
+        """未知の処理方法は末尾のデフォルト係数を指す"""
+        batch = WasteBatch.from_records(self.wastes)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(list(batch.quantities), [1000, 500, 30])
+        self.assertEqual(WASTE_FACTORS[batch.treatment_idx[1]],
+                         EmissionFactors.WASTE["incineration"])
+        self.assertEqual(batch.treatment_idx[2], len(WASTE_FACTORS) - 1)
+    
+    def test_empty_batches(self):
+        """空のレコード列でも計算できる"""
+        calc = GHGCalculator()
+        batches = (MaterialBatch.from_records([]), TransportBatch.from_records([]),
+                   WasteBatch.from_records([]))
+        self.assertEqual(len(calc.scope3_co2_vec(*batches)), 0)
+        self.assertEqual(calc.scope3_total_kg(*batches), 0.0)
+
+
+class TestScope3Vectorized(unittest.TestCase):
+    """Scope3 の一括計算とレコードごとの計算の比較"""
+    
+    def setUp(self):
+        _, self.materials, self.transports, self.wastes = sample_inputs()
+        self.calc = GHGCalculator()
+        self.batches = (MaterialBatch.from_records(self.materials),
+                        TransportBatch.from_records(self.transports),
+                        WasteBatch.from_records(self.wastes))
+        self.per_record = (
+            [self.calc.material_to_scope3_cat1(m) for m in self.materials]
+            + [self.calc.transport_to_scope3_cat4(t) for t in self.transports]
+            + [self.calc.waste_to_scope3_cat5(w) for w in self.wastes]
+        )
+    
+    def test_co2_vec_matches_per_record(self):
+        """scope3_co2_vec は Cat1 → Cat4 → Cat5 の順にレコードごとの値と一致"""
+        co2 = self.calc.scope3_co2_vec(*self.batches)
+        self.assertEqual(list(co2), [s.co2_kg for s in self.per_record])
+    
+    def test_category_vecs(self):
+        """カテゴリごとの配列もレコードごとの値と一致"""
+        materials, transports, wastes = self.batches
+        self.assertEqual(list(self.calc.materials_to_scope3_vec(materials)),
+                         [s.co2_kg for s in self.per_record[:2]])
+        self.assertEqual(list(self.calc.transports_to_scope3_vec(transports)),
+                         [s.co2_kg for s in self.per_record[2:5]])
+        self.assertEqual(list(self.calc.wastes_to_scope3_vec(wastes)),
+                         [s.co2_kg for s in self.per_record[5:]])
+    
+    def test_total_kg_matches_per_record(self):
+        """scope3_total_kg はレコードごとの CO2量の和"""
+        self.assertAlmostEqual(self.calc.scope3_total_kg(*self.batches),
+                               sum(s.co2_kg for s in self.per_record), places=9)
+    
+    def test_from_vec_matches_per_record(self):
+        """scope3_from_vec は明細の有無にかかわらずレコードごとの結果と一致"""
+        co2 = self.calc.scope3_co2_vec(*self.batches)
+        emissions = self.calc.scope3_from_vec(
+            self.materials, self.transports, self.wastes, co2)
+        self.assertEqual(emissions, self.per_record)
+        
+        bare = self.calc.scope3_from_vec(
+            self.materials, self.transports, self.wastes, co2,
+            include_descriptions=False)
+        self.assertEqual([(s.category, s.co2_kg) for s in bare],
+                         [(s.category, s.co2_kg) for s in self.per_record])
+        self.assertTrue(all(s.description == "" for s in bare))
+
+
+class TestSuperposition(unittest.TestCase):
+    """Superposition 展開のテスト"""
+    
+    def setUp(self):
+        self.energy, self.materials, self.transports, self.wastes = sample_inputs()
+        self.generator = GHGReportGenerator()
+    
+    def generate(self, **kwargs):
+        return self.generator.generate_with_superposition(
+            self.energy, self.materials, self.transports, self.wastes,
+            production_total=50000, period="2024-01", org="Sample Factory", **kwargs)
+    
+    def test_expand_superposition(self):
+        """totals[i][j] は Scope1[i] + Scope2[j] + Scope3"""
+        scope1_results, scope2_results, totals = \
+            self.generator.expand_superposition(self.energy, 12.5)
+        self.assertEqual(len(totals), len(scope1_results))
+        for (_, scope1), row in zip(scope1_results, totals):
+            self.assertEqual(len(row), len(scope2_results))
+            for (_, scope2), total in zip(scope2_results, row):
+                self.assertEqual(
+                    total, scope1.total_co2_ton + scope2.total_co2_ton + 12.5)
+    
+    def test_reports_use_totals(self):
+        """各レポートの合計は totals 行列の値"""
+        reports = self.generate()
+        scope3_total = next(iter(reports.values())).scope3_total_ton
+        _, _, totals = self.generator.expand_superposition(self.energy, scope3_total)
+        self.assertEqual([r.total_ton for r in reports.values()],
+                         [t for row in totals for t in row])
+    
+    def test_reports_match_per_record_aggregation(self):
+        """一括計算のレポートはレコードごとに集約したレポートと一致"""
+        calc = self.generator.builder.calculator_moe
+        scope3_list = (
+            [calc.material_to_scope3_cat1(m) for m in self.materials]
+            + [calc.transport_to_scope3_cat4(t) for t in self.transports]
+            + [calc.waste_to_scope3_cat5(w) for w in self.wastes]
+        )
+        report = self.generate()["energy_to_scope1_moe + energy_to_scope2_location"]
+        expected = calc.aggregate_to_report(
+            calc.energy_to_scope1(self.energy),
+            calc.energy_to_scope2_location(self.energy),
+            scope3_list, 50000, "2024-01", "Sample Factory")
+        self.assertAlmostEqual(report.total_ton, expected.total_ton, places=9)
+        self.assertAlmostEqual(report.scope3_total_ton, expected.scope3_total_ton, places=9)
+        self.assertEqual(report.scope1_total_ton, expected.scope1_total_ton)
+        self.assertEqual(report.details["scope3_categories"],
+                         expected.details["scope3_categories"])
+    
+    def test_without_scope3_details(self):
+        """明細なしでも合計は同じで、明細だけが空になる"""
+        full = self.generate()
+        bare = self.generate(include_scope3_details=False)
+        self.assertEqual(list(bare), list(full))
+        for name, report in full.items():
+            self.assertAlmostEqual(bare[name].total_ton, report.total_ton, places=9)
+            self.assertAlmostEqual(bare[name].scope3_total_ton,
+                                   report.scope3_total_ton, places=9)
+            self.assertEqual(bare[name].scope1_total_ton, report.scope1_total_ton)
+            self.assertEqual(bare[name].scope2_total_ton, report.scope2_total_ton)
+            self.assertEqual(bare[name].calculation_method, name)
+            self.assertEqual(bare[name].details["scope3_categories"], [])
+            self.assertEqual(len(report.details["scope3_categories"]), 8)
+    
+    def test_superposition_extremes(self):
+        """最小・最大の方法名は min / max と一致"""
+        reports = self.generate()
+        lo, hi = self.generator.superposition_extremes(reports)
+        self.assertEqual(lo, min(reports, key=lambda n: reports[n].total_ton))
+        self.assertEqual(hi, max(reports, key=lambda n: reports[n].total_ton))
+        self.assertLess(reports[lo].total_ton, reports[hi].total_ton)
+    
+    def test_superposition_extremes_empty(self):
+        """空のレポートは ValueError"""
+        with self.assertRaises(ValueError):
+            self.generator.superposition_extremes({})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
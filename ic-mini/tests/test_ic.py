@@ -15,7 +15,8 @@ sys.path.insert(0, '/home/claude/ic-mini/src')
 
 from ic import (
     parse, evaluate, Evaluator,
-    Num, Var, Lam, App, Sup, Dup, Era, Op2, Pair, Dp0, Dp1
+    Num, Var, Lam, App, Sup, Dup, Era, Op2, Pair, Dp0, Dp1,
+    free_vars, free_dps, term_size, format_result
 )
 
 
@@ -261,6 +262,35 @@ class TestEdgeCases(unittest.TestCase):
         """使われない複製変数"""
         result = evaluate("! x &L= 5; 42")
         self.assertEqual(str(result), "42")
+    
+    def test_parse_is_cached(self):
+        """同じ文字列のパース結果は共有される（項は不変）"""
+        self.assertIs(parse("(λx.x 42)"), parse("(λx.x 42)"))
+    
+    def test_dp_mask(self):
+        """dp_mask: name₀ / name₁ の出現をビットマスクで返す"""
+        evaluator = Evaluator()
+        self.assertEqual(evaluator.dp_mask(parse("(x_0, (x_1 + y_0))"), "x"), 3)
+        self.assertEqual(evaluator.dp_mask(parse("(x_1, y_0)"), "x"), 2)
+        self.assertEqual(evaluator.dp_mask(parse("λz.(x_0 z)"), "x"), 1)
+        self.assertEqual(evaluator.dp_mask(parse("(y_0, x)"), "x"), 0)
+    
+    def test_normal_form_detected_in_one_step(self):
+        """正規形の項は1ステップで停止し、同じオブジェクトを返す"""
+        term = parse("λx.(x, &L{1, 2})")
+        evaluator = Evaluator()
+        result = evaluator.evaluate(term)
+        self.assertIs(result, term)
+        self.assertEqual(evaluator.steps, 1)
+    
+    def test_self_reproducing_term_stops(self):
+        """自分自身に簡約される項（ω）は数ステップで停止する"""
+        for code, steps in [("(λx.(x x) λx.(x x))", 1),
+                            ("! f &L= λx.(x x); (f₀ f₁)", 3)]:
+            evaluator = Evaluator(max_steps=50)
+            result = evaluator.evaluate(parse(code))
+            self.assertEqual(evaluator.steps, steps, code)
+            self.assertEqual(result, evaluator.reduce(result))
 
 
 class TestPrettyPrint(unittest.TestCase):
@@ -286,6 +316,44 @@ class TestPrettyPrint(unittest.TestCase):
     
     def test_sup_str(self):
         self.assertEqual(str(Sup("L", Num(1), Num(2))), "&L{1, 2}")
+    
+    def test_format_result_truncates_large_terms(self):
+        """REPL表示: 大きな項は先頭部分だけを表示する"""
+        term = parse("((a, (b, c)), (d, e))")
+        self.assertEqual(term_size(term), 9)
+        self.assertEqual(format_result(term), str(term))
+        self.assertEqual(
+            format_result(term, max_nodes=5, preview_nodes=3),
+            "((a, ...), ...) (9 nodes, truncated)"
+        )
+    
+    def test_nested_str(self):
+        term = Dup("x", "L", Era(), Pair(Op2("+", Dp0("x"), Num(1)), Lam("y", Dp1("x"))))
+        self.assertEqual(str(term), "! x &L= &{}; ((x₀ + 1), λy.x₁)")
+
+
+class TestTermImmutability(unittest.TestCase):
+    """項の不変性のテスト"""
+    
+    def test_terms_are_frozen(self):
+        """項は生成後に書き換えられない（部分項を安全に共有できる）"""
+        term = App(Lam("x", Var("x")), Num(1))
+        with self.assertRaises(AttributeError):
+            term.arg = Num(2)
+        self.assertFalse(hasattr(term, "__dict__"))
+    
+    def test_free_vars(self):
+        """自由変数・複製変数の集合"""
+        term = parse("λx.(x, ! d &L= y; (d_0 + z_1))")
+        self.assertEqual(free_vars(term), {"y"})
+        self.assertEqual(free_dps(term), {"d", "z"})
+    
+    def test_substitute_shares_untouched_subterms(self):
+        """置換対象を含まない部分項はコピーせずに共有する"""
+        term = parse("((a b), x)")
+        result = Evaluator().substitute(term, "x", Num(1))
+        self.assertIs(result.fst, term.fst)
+        self.assertEqual(str(result), "((a b), 1)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+"""
+Type Inhabitation - テストスイート
+
+テストカテゴリ:
+1. 最小コストパス探索
+2. 複数の問い合わせの一括探索
+"""
+
+import unittest
+from unittest import mock
+import random
+import sys
+import os
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_here, '..', 'src'))
+sys.path.insert(0, os.path.join(_here, '..'))
+
+from type_inhabitation import (
+    TypeEnvironment, TypedFunc, PathFinder, make_type, create_data_pipeline_env
+)
+
+
+class TestCheapestPath(unittest.TestCase):
+    """最小コストパス探索のテスト"""
+    
+    def setUp(self):
+        # A→B→G と A→C→G はどちらもコスト 2.0。A→C の方が先に確定する
+        self.A, self.B, self.C, self.G = (make_type(n) for n in "ABCG")
+        self.env = TypeEnvironment()
+        for name, src, dst, cost in [("ab", self.A, self.B, 1.5),
+                                     ("ac", self.A, self.C, 0.5),
+                                     ("bg", self.B, self.G, 0.5),
+                                     ("cg", self.C, self.G, 1.5)]:
+            self.env.add(TypedFunc(name, src, dst, lambda x: x, cost))
+    
+    def names(self, path):
+        return [f.name for f in path.steps]
+    
+    def test_tie_takes_first_settled_prefix(self):
+        """同コスト・同じ長さなら先に確定した接頭辞から伸びたパス"""
+        path = PathFinder(self.env).find_cheapest_path(self.A, self.G)
+        self.assertEqual(self.names(path), ["ac", "cg"])
+        self.assertEqual(path.cost, 2.0)
+    
+    def test_tie_takes_first_edge(self):
+        """同じ接頭辞からの同コストの辺は追加順"""
+        self.env.add(TypedFunc("ag1", self.A, self.G, lambda x: x, 1.0))
+        self.env.add(TypedFunc("ag2", self.A, self.G, lambda x: x, 1.0))
+        finder = PathFinder(self.env)
+        self.assertEqual(self.names(finder.find_cheapest_path(self.A, self.G)), ["ag1"])
+        finder.find_paths(self.A, self.G)
+        self.assertEqual(self.names(finder.find_cheapest_path(self.A, self.G)), ["ag1"])
+    
+    def test_cached_and_fresh_agree(self):
+        """find_paths の後でも結果が変わらない"""
+        finder = PathFinder(self.env)
+        fresh = finder.find_cheapest_path(self.A, self.G)
+        paths = finder.find_paths(self.A, self.G)
+        cached = finder.find_cheapest_path(self.A, self.G)
+        self.assertEqual(cached, fresh)
+        self.assertEqual(cached.cost, min(p.cost for p in paths))
+    
+    def test_cached_and_fresh_agree_on_random_graphs(self):
+        """同コストの多いランダムなグラフでもキャッシュの有無で結果が同じ"""
+        rng = random.Random(0)
+        types = [make_type(f"R{i}") for i in range(6)]
+        for _ in range(100):
+            env = TypeEnvironment()
+            for k in range(rng.randint(4, 14)):
+                src, dst = rng.choice(types), rng.choice(types)
+                env.add(TypedFunc(f"f{k}", src, dst, lambda x: x,
+                                  rng.choice([0.0, 0.5, 1.0, 1.5])))
+            max_depth = rng.randint(1, 5)
+            for start in types:
+                for goal in types:
+                    fresh = PathFinder(env, max_depth).find_cheapest_path(start, goal)
+                    finder = PathFinder(env, max_depth)
+                    paths = finder.find_paths(start, goal)
+                    cached = finder.find_cheapest_path(start, goal)
+                    self.assertEqual(fresh, cached)
+                    if paths:
+                        self.assertEqual(fresh.cost, min(p.cost for p in paths))
+    
+    def test_cheaper_longer_path(self):
+        """辺が多くても安いパスを選ぶ"""
+        self.env.add(TypedFunc("ag", self.A, self.G, lambda x: x, 3.0))
+        path = PathFinder(self.env).find_cheapest_path(self.A, self.G)
+        self.assertEqual(self.names(path), ["ac", "cg"])
+    
+    def test_tie_prefers_fewer_steps(self):
+        """同コストなら辺の少ないパス"""
+        self.env.add(TypedFunc("ag", self.A, self.G, lambda x: x, 2.0))
+        path = PathFinder(self.env).find_cheapest_path(self.A, self.G)
+        self.assertEqual(self.names(path), ["ag"])
+    
+    def test_respects_max_depth(self):
+        """深さ制限を超えるパスは返さない"""
+        finder = PathFinder(self.env, max_depth=1)
+        self.assertIsNone(finder.find_cheapest_path(self.A, self.G))
+        self.assertEqual(finder.find_cheapest_path(self.A, self.A).steps, ())
+    
+    def test_dense_graph(self):
+        """完全グラフでもパスを列挙せずに求まる"""
+        env = TypeEnvironment()
+        types = [make_type(f"K{i}") for i in range(12)]
+        goal = make_type("KGoal")
+        for i, src in enumerate(types):
+            for j, dst in enumerate(types):
+                if i != j:
+                    env.add(TypedFunc(f"k{i}_{j}", src, dst, lambda x: x, 1.0))
+        env.add(TypedFunc("exit", types[-1], goal, lambda x: x, 100.0))
+        path = PathFinder(env, max_depth=8).find_cheapest_path(types[0], goal)
+        self.assertEqual(self.names(path), ["k0_11", "exit"])
+
+
+class TestFindPathsBatch(unittest.TestCase):
+    """find_paths_batch のテスト"""
+    
+    def setUp(self):
+        self.env = create_data_pipeline_env()
+        types = sorted(self.env.get_types(), key=str)
+        self.queries = [(s, g) for s in types for g in types]
+        sequential = PathFinder(self.env)
+        self.expected = {q: sequential.find_paths(*q) for q in self.queries}
+    
+    def assertMatchesSequential(self, result):
+        self.assertEqual(list(result), self.queries)
+        for q in self.queries:
+            # 子プロセスから戻ったパスも同じ関数オブジェクトを指す
+            self.assertEqual([[id(f) for f in p.steps] for p in result[q]],
+                             [[id(f) for f in p.steps] for p in self.expected[q]])
+    
+    def test_forked_workers(self):
+        """子プロセスで探索しても逐次探索と同じ結果"""
+        self.assertMatchesSequential(
+            PathFinder(self.env).find_paths_batch(self.queries, max_workers=2))
+    
+    def test_without_fork(self):
+        """fork が使えなければ逐次探索にフォールバック"""
+        with mock.patch("multiprocessing.get_all_start_methods",
+                        return_value=["spawn"]), \
+             mock.patch("type_inhabitation.ProcessPoolExecutor") as pool:
+            result = PathFinder(self.env).find_paths_batch(self.queries, max_workers=4)
+        pool.assert_not_called()
+        self.assertMatchesSequential(result)
+    
+    def test_single_cpu(self):
+        """CPU が1つなら逐次探索"""
+        with mock.patch("os.cpu_count", return_value=1), \
+             mock.patch("type_inhabitation.ProcessPoolExecutor") as pool:
+            result = PathFinder(self.env).find_paths_batch(self.queries)
+        pool.assert_not_called()
+        self.assertMatchesSequential(result)
+    
+    def test_results_are_cached(self):
+        """バッチの結果は find_paths のキャッシュに入る"""
+        finder = PathFinder(self.env)
+        finder.find_paths_batch(self.queries, max_workers=2)
+        with mock.patch.object(finder, "_search") as search:
+            for q in self.queries:
+                self.assertEqual(finder.find_paths(*q), self.expected[q])
+        search.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
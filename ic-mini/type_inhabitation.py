@@ -18,7 +18,13 @@ Interaction Calculus の活用:
 - Labels: 異なる探索ブランチの区別
 """
 
-from dataclasses import dataclass, field
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+import multiprocessing
+import os
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
 from typing import Dict, List, Callable, Any, Optional, Set, Tuple
 from abc import ABC, abstractmethod
 import sys
@@ -30,56 +36,84 @@ from ic import Term, Lam, App, Sup, Dup, Num, Var, Dp0, Dp1, Era, Pair, evaluate
 # 型システム
 # =============================================================================
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Type:
-    """型を表す基底クラス"""
+    """
+    型を表す基底クラス
+    
+    名前は sys.intern し、ハッシュは生成時に1度だけ計算して保持する
+    （サブクラスも __hash__ = Type.__hash__ でこれを使う）
+    """
     name: str
+    _hash: int = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'name', sys.intern(self.name))
+        key = tuple(getattr(self, f.name) for f in fields(self) if f.compare)
+        object.__setattr__(self, '_hash', hash(key))
+    
+    def __hash__(self):
+        return self._hash
     
     def __str__(self):
         return self.name
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class FuncType(Type):
     """関数型 A → B"""
     arg: Type
     ret: Type
     
+    __hash__ = Type.__hash__
+    
     def __str__(self):
         return f"({self.arg} → {self.ret})"
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ListType(Type):
     """リスト型 List[A]"""
     elem: Type
     
+    __hash__ = Type.__hash__
+    
     def __str__(self):
         return f"List[{self.elem}]"
 
 
-@dataclass(frozen=True) 
+@dataclass(frozen=True, slots=True)
 class OptionType(Type):
     """オプション型 Option[A]"""
     elem: Type
     
+    __hash__ = Type.__hash__
+    
     def __str__(self):
         return f"Option[{self.elem}]"
 
 
+# 基本型の生成は make_type を通すと、等しい型が同じオブジェクトになる
+# （辞書・集合の検索は同一オブジェクトならフィールド比較をせずに済む）
+
+@lru_cache(maxsize=None)
+def make_type(name: str) -> Type:
+    return Type(name)
+
+
 # 基本型
-Int = Type("Int")
-String = Type("String")
-Bool = Type("Bool")
-Float = Type("Float")
-Unit = Type("Unit")
+Int = make_type("Int")
+String = make_type("String")
+Bool = make_type("Bool")
+Float = make_type("Float")
+Unit = make_type("Unit")
 
 
 # =============================================================================
 # 関数（エッジ）定義
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
 class TypedFunc:
     """
     型付き関数 = グラフのエッジ
@@ -96,10 +130,19 @@ class TypedFunc:
     impl: Callable[[Any], Any]
     cost: float = 1.0
     
+    def __post_init__(self):
+        self.name = sys.intern(self.name)
+    
     def __str__(self):
         return f"{self.name}: {self.arg_type} → {self.ret_type}"
     
     def __call__(self, x):
+        """
+        単発呼び出し用の簡便メソッド
+        
+        フレームが1段増えるので、繰り返し呼ぶ側（Path.compose_impl など）は
+        impl を直接取り出して呼ぶ
+        """
         return self.impl(x)
 
 
@@ -119,10 +162,37 @@ class TypeEnvironment:
         self.functions: List[TypedFunc] = []
         self.by_arg: Dict[Type, List[TypedFunc]] = {}
         self.by_ret: Dict[Type, List[TypedFunc]] = {}
+        # 探索用の整数 ID 表現: 型 → ID と、ID ごとの (関数, 行き先ID) の隣接リスト
+        self.type_ids: Dict[Type, int] = {}
+        self.types: List[Type] = []
+        self.out_edges: List[List[Tuple[TypedFunc, int]]] = []
+        # id(関数) → 始点の out_edges での位置
+        self.edge_pos: Dict[int, int] = {}
+        # add のたびに増える版数（PathFinder のキャッシュ無効化に使う）
+        self.version = 0
+    
+    def type_id(self, typ: Type) -> int:
+        """型の整数 ID（未登録なら採番する）"""
+        tid = self.type_ids.get(typ)
+        if tid is None:
+            tid = len(self.types)
+            self.type_ids[typ] = tid
+            self.types.append(typ)
+            self.out_edges.append([])
+        return tid
     
     def add(self, func: TypedFunc):
         """関数を環境に追加"""
         self.functions.append(func)
+        self.version += 1
+        
+        # 同じ関数の重複登録は探索グラフでは1本の辺にまとめる
+        # （辺が一意なら探索で同じパスが2度見つかることはない）
+        src = self.type_id(func.arg_type)
+        dst = self.type_id(func.ret_type)
+        if id(func) not in self.edge_pos:
+            self.edge_pos[id(func)] = len(self.out_edges[src])
+            self.out_edges[src].append((func, dst))
         
         if func.arg_type not in self.by_arg:
             self.by_arg[func.arg_type] = []
@@ -153,14 +223,63 @@ class TypeEnvironment:
 # パス（証明/項）
 # =============================================================================
 
-@dataclass
+# これ以下の長さのパスは合成関数を直列のコードとして生成する
+# （長すぎると入れ子の括弧がパーサの上限に達するのでループで合成）
+CODEGEN_MAX_STEPS = 32
+
+
+@lru_cache(maxsize=None)
+def _chain_code(n: int):
+    """長さ n の合成関数 def _c(x): return f{n-1}(...f1(f0(x))) をコンパイル"""
+    calls = "".join(f"f{i}(" for i in reversed(range(n)))
+    source = f"def _c(x):\n    return {calls}x{')' * n}\n"
+    return compile(source, f"<path composition {n}>", "exec")
+
+
+def _compose_chain(impls: Tuple[Callable[[Any], Any], ...]) -> Callable[[Any], Any]:
+    """impl の列を1つの関数に合成"""
+    if len(impls) <= CODEGEN_MAX_STEPS:
+        namespace = {f"f{i}": impl for i, impl in enumerate(impls)}
+        exec(_chain_code(len(impls)), namespace)
+        return namespace["_c"]
+    
+    def composed(x):
+        result = x
+        for impl in impls:
+            result = impl(result)
+        return result
+    return composed
+
+
+@dataclass(slots=True, eq=False)
 class Path:
     """
     型から型へのパス = 関数の合成列
     
     これは型理論的には「証明」または「項」に対応する
+    等価性は同じ関数オブジェクトの列かどうか（関数は環境に1つずつ登録される）
     """
-    steps: List[TypedFunc]
+    steps: Tuple[TypedFunc, ...]
+    _composed: Optional[Callable[[Any], Any]] = field(
+        default=None, init=False, repr=False, compare=False)
+    _lambda: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False)
+    _cost: Optional[float] = field(
+        default=None, init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        self.steps = tuple(self.steps)
+    
+    def _key(self) -> Tuple[int, ...]:
+        return tuple(map(id, self.steps))
+    
+    def __eq__(self, other):
+        if not isinstance(other, Path):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        return hash(self._key())
     
     @property
     def start(self) -> Optional[Type]:
@@ -172,7 +291,10 @@ class Path:
     
     @property
     def cost(self) -> float:
-        return sum(s.cost for s in self.steps)
+        """ステップのコストの和（初回に計算して保持）"""
+        if self._cost is None:
+            self._cost = sum(s.cost for s in self.steps)
+        return self._cost
     
     def __str__(self):
         if not self.steps:
@@ -183,40 +305,76 @@ class Path:
         return path_str
     
     def compose_impl(self) -> Callable[[Any], Any]:
-        """パスに沿ったimplを合成"""
-        def composed(x):
-            result = x
-            for step in self.steps:
-                result = step.impl(result)
-            return result
-        return composed
+        """パスに沿ったimplを合成（合成結果はパスに保持して再利用）"""
+        if self._composed is None:
+            self._composed = _compose_chain(tuple(step.impl for step in self.steps))
+        return self._composed
     
     def execute(self, input_value: Any) -> Any:
         """パスに沿って計算を実行"""
         return self.compose_impl()(input_value)
     
     def to_lambda(self) -> str:
-        """パスをラムダ式として表現"""
-        if not self.steps:
-            return "λx.x"
-        
-        # 内側から構築: f3(f2(f1(x)))
-        expr = "x"
-        for step in self.steps:
-            expr = f"({step.name} {expr})"
-        return f"λx.{expr}"
+        """パスをラムダ式として表現（結果はパスに保持して再利用）"""
+        if self._lambda is None:
+            # 外側から一度に連結: (f3 (f2 (f1 x)))
+            opens = "".join(f"({step.name} " for step in reversed(self.steps))
+            self._lambda = f"λx.{opens}x{')' * len(self.steps)}"
+        return self._lambda
 
 
 # =============================================================================
 # パス探索エンジン（Interaction Calculus風）
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True)
+class PathNode:
+    """
+    探索中のパス（末尾の関数と親への参照だけを持つ連結リスト）
+    
+    同じ接頭辞を持つパスは親ノードを共有するので、展開ごとに
+    ステップ列をコピーしなくてよい
+    """
+    parent: Optional['PathNode']
+    step: TypedFunc
+    depth: int
+    
+    def to_path(self) -> Path:
+        """親をたどってステップ列を復元"""
+        steps = []
+        node = self
+        while node is not None:
+            steps.append(node.step)
+            node = node.parent
+        steps.reverse()
+        return Path(tuple(steps))
+
+
+@dataclass(slots=True)
 class SearchState:
-    """探索状態"""
-    current_type: Type
-    path: Path
-    visited: Set[Type] = field(default_factory=set)
+    """探索状態（型は TypeEnvironment の整数 ID。node が None なら空パス）"""
+    current_id: int
+    node: Optional[PathNode]
+    visited: int = 0  # 訪問済みの型 ID のビット集合
+    
+    @property
+    def depth(self) -> int:
+        return self.node.depth if self.node is not None else 0
+    
+    def to_path(self) -> Path:
+        return self.node.to_path() if self.node is not None else Path(())
+
+
+# find_paths_batch の子プロセスが fork 時に引き継ぐ探索器
+_batch_finder: Optional['PathFinder'] = None
+
+
+def _search_indices(query: Tuple[Type, Type]) -> List[Tuple[int, ...]]:
+    """子プロセス側: パスを env.functions の添字列として返す"""
+    finder = _batch_finder
+    index = {id(f): i for i, f in enumerate(finder.env.functions)}
+    return [tuple(index[id(step)] for step in path.steps)
+            for path in finder._search(*query)]
 
 
 class PathFinder:
@@ -231,67 +389,191 @@ class PathFinder:
     def __init__(self, env: TypeEnvironment, max_depth: int = 10):
         self.env = env
         self.max_depth = max_depth
+        # (start, goal) → 探索結果。env.version が変わったら捨てる
+        self._cache: Dict[Tuple[Type, Type], Tuple[Path, ...]] = {}
+        self._cache_version = env.version
     
     def find_paths(self, start: Type, goal: Type) -> List[Path]:
         """
         startからgoalへのすべてのパスを探索
         
         これは type inhabitation: 型 (start → goal) の住人を見つける
+        同じ (start, goal) の探索結果はキャッシュして再利用する
+        """
+        cached = self._cached_paths(start, goal)
+        if cached is None:
+            cached = tuple(self._search(start, goal))
+            self._cache[(start, goal)] = cached
+        return list(cached)
+    
+    def _cached_paths(self, start: Type, goal: Type) -> Optional[Tuple[Path, ...]]:
+        """キャッシュ済みの探索結果（なければ None）"""
+        if self._cache_version != self.env.version:
+            self._cache.clear()
+            self._cache_version = self.env.version
+        return self._cache.get((start, goal))
+    
+    def _search(self, start: Type, goal: Type, first_only: bool = False) -> List[Path]:
+        """
+        BFS で start から goal へのパスを列挙
+        
+        first_only なら最初に見つかったパス（BFS なので最短）だけで打ち切る
         """
         all_paths = []
         
-        # BFS探索
-        initial_state = SearchState(
-            current_type=start,
-            path=Path([]),
-            visited={start}
-        )
-        queue = [initial_state]
+        if start == goal:
+            return [Path(())]
+        start_id = self.env.type_ids.get(start)
+        goal_id = self.env.type_ids.get(goal)
+        if start_id is None or goal_id is None:
+            return all_paths
+        out_edges = self.env.out_edges
+        
+        # BFS探索（内側のループで使う属性はローカルに束ねておく）
+        max_depth = self.max_depth
+        bits = [1 << tid for tid in range(len(out_edges))]
+        queue = deque([SearchState(start_id, None, bits[start_id])])
+        popleft = queue.popleft
+        push = queue.append
         
         while queue:
-            state = queue.pop(0)
+            state = popleft()
             
             # ゴールに到達
-            if state.current_type == goal:
-                all_paths.append(state.path)
+            if state.current_id == goal_id:
+                all_paths.append(state.to_path())
+                if first_only:
+                    break
                 continue
             
             # 深さ制限
-            if len(state.path.steps) >= self.max_depth:
+            depth = state.depth
+            if depth >= max_depth:
                 continue
             
             # 次の候補を探索（Superposition的に全候補を考慮）
-            for func in self.env.get_outgoing(state.current_type):
-                next_type = func.ret_type
-                
+            node = state.node
+            visited = state.visited
+            for func, next_id in out_edges[state.current_id]:
                 # サイクル回避（単純なケース）
-                if next_type in state.visited and next_type != goal:
+                bit = bits[next_id]
+                if visited & bit and next_id != goal_id:
                     continue
                 
-                new_path = Path(state.path.steps + [func])
-                new_visited = state.visited | {next_type}
-                
-                queue.append(SearchState(
-                    current_type=next_type,
-                    path=new_path,
-                    visited=new_visited
+                push(SearchState(
+                    next_id,
+                    PathNode(node, func, depth + 1),
+                    visited | bit
                 ))
         
         return all_paths
     
+    def find_paths_batch(self, queries: List[Tuple[Type, Type]],
+                         max_workers: Optional[int] = None
+                         ) -> Dict[Tuple[Type, Type], List[Path]]:
+        """
+        複数の (start, goal) を並列に探索
+        
+        環境は fork で子プロセスに引き継ぎ、子は見つけたパスを
+        env.functions の添字列で返す（impl は lambda なので pickle できない）。
+        fork が使えない環境、ワーカーが1つ、未探索の問い合わせが1件以下なら
+        逐次探索する
+        """
+        workers = max_workers or os.cpu_count() or 1
+        pending = [q for q in dict.fromkeys(queries)
+                   if self._cached_paths(*q) is None]
+        if (workers > 1 and len(pending) > 1
+                and 'fork' in multiprocessing.get_all_start_methods()):
+            global _batch_finder
+            _batch_finder = self
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=min(workers, len(pending)),
+                    mp_context=multiprocessing.get_context('fork')
+                ) as executor:
+                    found = list(executor.map(_search_indices, pending))
+            finally:
+                _batch_finder = None
+            functions = self.env.functions
+            for query, index_paths in zip(pending, found):
+                self._cache[query] = tuple(
+                    Path(tuple(functions[i] for i in indices))
+                    for indices in index_paths
+                )
+        return {q: self.find_paths(*q) for q in queries}
+    
     def find_shortest_path(self, start: Type, goal: Type) -> Optional[Path]:
-        """最短パスを見つける"""
-        paths = self.find_paths(start, goal)
-        if not paths:
-            return None
-        return min(paths, key=lambda p: len(p.steps))
+        """最短パスを見つける（BFS で最初に到達したパス）"""
+        paths = self._cached_paths(start, goal)
+        if paths is None:
+            paths = self._search(start, goal, first_only=True)
+        return paths[0] if paths else None
     
     def find_cheapest_path(self, start: Type, goal: Type) -> Optional[Path]:
-        """最小コストパスを見つける"""
-        paths = self.find_paths(start, goal)
-        if not paths:
+        """
+        最小コストパスを見つける
+        
+        (型, 深さ) を状態とする Dijkstra 法。関数のコストは非負を前提とする。
+        優先度は (コスト, 深さ) なので、同コストなら辺の少ないパスを選ぶ
+        （最小コストかつ最短のパスは同じ型を2度通らない）。
+        それも同じなら先に確定した接頭辞から伸びたパス（_settle_order）
+        """
+        paths = self._cached_paths(start, goal)
+        if paths is not None:
+            return min(paths, key=self._settle_order) if paths else None
+        
+        if start == goal:
+            return Path(())
+        start_id = self.env.type_ids.get(start)
+        goal_id = self.env.type_ids.get(goal)
+        if start_id is None or goal_id is None:
             return None
-        return min(paths, key=lambda p: p.cost)
+        out_edges = self.env.out_edges
+        
+        # (コスト, 深さ, 追加順, 型ID, 親ノード, 関数)。追加順でノード同士の比較を避ける
+        # PathNode はヒープから取り出して確定したときに初めて作る
+        heap = [(0.0, 0, 0, start_id, None, None)]
+        counter = 0
+        # 型ごとに確定済みの最小の深さ。それ以上深い到達は優越されている
+        settled = [self.max_depth + 1] * len(out_edges)
+        
+        while heap:
+            cost, depth, _, tid, parent, func = heapq.heappop(heap)
+            if tid == goal_id:
+                # 緩和で足したコストは Path.cost と同じ順序の和
+                path = PathNode(parent, func, depth).to_path()
+                path._cost = cost
+                return path
+            if settled[tid] <= depth:
+                continue
+            settled[tid] = depth
+            if depth >= self.max_depth:
+                continue
+            node = PathNode(parent, func, depth) if func is not None else None
+            for func, next_id in out_edges[tid]:
+                if settled[next_id] <= depth + 1:
+                    continue
+                counter += 1
+                heapq.heappush(heap, (
+                    cost + func.cost, depth + 1, counter, next_id, node, func
+                ))
+        return None
+    
+    def _settle_order(self, path: Path) -> tuple:
+        """
+        find_cheapest_path の Dijkstra がパスを取り出す順のキー
+        
+        同じ (コスト, 深さ) のエントリは追加順に取り出され、追加順は
+        親の取り出し順と辺の位置で決まるので、接頭辞ごとに
+        (コスト, 深さ, 親のキー, 辺の位置) を入れ子にすれば同じ順序になる
+        """
+        edge_pos = self.env.edge_pos
+        key = ()
+        cost = 0.0
+        for depth, step in enumerate(path.steps, 1):
+            cost += step.cost
+            key = (cost, depth, key, edge_pos[id(step)])
+        return key
     
     def paths_to_superposition(self, paths: List[Path]) -> str:
         """
@@ -318,6 +600,7 @@ class ICCompiler:
     
     def __init__(self, env: TypeEnvironment):
         self.env = env
+        self.finder = PathFinder(env)
         self.func_impls: Dict[str, Callable] = {}
         
         # 関数名とimplの対応を記録
@@ -329,25 +612,20 @@ class ICCompiler:
         return path.to_lambda()
     
     def paths_to_ic_superposition(self, paths: List[Path], label: str = "P") -> str:
-        """複数パスをSuperpositionに変換"""
+        """
+        複数パスをSuperpositionに変換
+        
+        右に入れ子にする: &P{p0, &Q{p1, p2}}（ラベルは1段ごとに次の文字）
+        """
         if not paths:
             return "&{}"
-        if len(paths) == 1:
-            return self.path_to_ic(paths[0])
         
-        # 2つずつSuperpositionにまとめる
         lambdas = [self.path_to_ic(p) for p in paths]
-        
-        # 簡単のため最初の2つだけ
-        if len(lambdas) == 2:
-            return f"&{label}{{{lambdas[0]}, {lambdas[1]}}}"
-        else:
-            # 再帰的にネスト
-            rest = self.paths_to_ic_superposition(
-                paths[1:], 
-                label=chr(ord(label) + 1)
-            )
-            return f"&{label}{{{lambdas[0]}, {rest}}}"
+        base = ord(label)
+        parts = [f"&{chr(base + i)}{{{lam}, " for i, lam in enumerate(lambdas[:-1])]
+        parts.append(lambdas[-1])
+        parts.append("}" * (len(lambdas) - 1))
+        return "".join(parts)
     
     def compile_search(self, start: Type, goal: Type, input_var: str = "x") -> str:
         """
@@ -355,8 +633,7 @@ class ICCompiler:
         
         返り値: 入力を受け取り、全パスの結果を返すIC項
         """
-        finder = PathFinder(self.env)
-        paths = finder.find_paths(start, goal)
+        paths = self.finder.find_paths(start, goal)
         
         if not paths:
             return "&{}"  # 住人なし
@@ -369,6 +646,14 @@ class ICCompiler:
 # 実用例：データ変換パイプライン
 # =============================================================================
 
+def _parse_int(x: str) -> int:
+    """整数として読めない文字列は 0（負数や前後の空白も受け付ける）"""
+    try:
+        return int(x)
+    except ValueError:
+        return 0
+
+
 def create_data_pipeline_env() -> TypeEnvironment:
     """データ変換パイプラインの型環境を作成"""
     env = TypeEnvironment()
@@ -386,7 +671,7 @@ def create_data_pipeline_env() -> TypeEnvironment:
         name="parseInt",
         arg_type=String,
         ret_type=Int,
-        impl=lambda x: int(x) if x.isdigit() else 0
+        impl=_parse_int
     ))
     
     # Int → Float
@@ -470,11 +755,11 @@ def create_data_pipeline_env() -> TypeEnvironment:
 # =============================================================================
 
 # カスタム型
-UserId = Type("UserId")
-UserName = Type("UserName")  
-Email = Type("Email")
-JsonString = Type("JsonString")
-HttpResponse = Type("HttpResponse")
+UserId = make_type("UserId")
+UserName = make_type("UserName")  
+Email = make_type("Email")
+JsonString = make_type("JsonString")
+HttpResponse = make_type("HttpResponse")
 
 
 def create_api_env() -> TypeEnvironment:
@@ -10,6 +10,8 @@ Interaction NET デモスクリプト
 
 import sys
 import os
+import io
+import contextlib
 
 # パスを追加
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -30,11 +32,12 @@ def print_header(title):
     print("="*70)
 
 
-def demo_basic_net():
-    """基本的なネットワークのデモ"""
+def demo_basic_net(net=None):
+    """基本的なネットワークのデモ（net を渡すとそれを使う）"""
     print_header("1. 基本的なネットワーク: λx.(x + 1)")
     
-    net = create_simple_net()
+    if net is None:
+        net = create_simple_net()
     
     print(f"\nノード数: {len(net.nodes)}")
     print(f"エッジ数: {len(net.edges)}")
@@ -122,10 +125,8 @@ def demo_ghg_net():
             print(f"  - {node_id}: {value_lines[0] if value_lines else node.type_name}")
     
     # セルの統計
-    dup_count = sum(1 for c in ghg_net.cells.values() 
-                    if not c.metadata.get('superposition'))
-    sup_count = sum(1 for c in ghg_net.cells.values() 
-                    if c.metadata.get('superposition'))
+    sup_count = len(ghg_net.cells_of_kind('superposition'))
+    dup_count = len(ghg_net.cells) - sup_count
     
     print("\nセルの統計:")
     print(f"  - デュプリケータ: {dup_count}")
@@ -141,25 +142,26 @@ def demo_type_inhabitation():
     print("\n探索問題:")
     print("  Int (42) を String に変換する方法を探す")
     
-    # パスの探索
+    # パスの探索（3つの終点を1回の探索でまとめて調べる）
     print("\n発見された証明（パス）:")
+    proofs = net.find_paths_multi("int_input", ["str_direct", "str_via_float", "str_via_bool"])
     
     # 証明1: 直接
-    paths1 = net.find_paths("int_input", "str_direct")
+    paths1 = proofs["str_direct"]
     print(f"\n  証明1 (直接): {len(paths1)} パス")
     if paths1:
         for edge in paths1[0]:
             print(f"    {edge.source.id} --[{edge.function}]--> {edge.target.id}")
     
     # 証明2: Float経由
-    paths2 = net.find_paths("int_input", "str_via_float")
+    paths2 = proofs["str_via_float"]
     print(f"\n  証明2 (Float経由): {len(paths2)} パス")
     if paths2:
         for edge in paths2[0]:
             print(f"    {edge.source.id} --[{edge.function}]--> {edge.target.id}")
     
     # 証明3: Bool経由
-    paths3 = net.find_paths("int_input", "str_via_bool")
+    paths3 = proofs["str_via_bool"]
     print(f"\n  証明3 (Bool経由): {len(paths3)} パス")
     if paths3:
         for edge in paths3[0]:
@@ -168,11 +170,12 @@ def demo_type_inhabitation():
     print(f"\n合計: {len(paths1) + len(paths2) + len(paths3)} 個の証明を発見")
 
 
-def demo_json_export():
-    """JSON出力のデモ"""
+def demo_json_export(net=None):
+    """JSON出力のデモ（net を渡すとそれを使う）"""
     print_header("6. JSON形式でのエクスポート")
     
-    net = create_simple_net()
+    if net is None:
+        net = create_simple_net()
     json_str = net.to_json()
     
     print("\nJSON出力 (抜粋):")
@@ -182,29 +185,39 @@ def demo_json_export():
 
 
 def main():
-    """メイン関数"""
-    print("\n" + "🌐" * 35)
-    print(" " * 15 + "Interaction NET デモ")
-    print("🌐" * 35)
+    """メイン関数（出力はまとめて一度に書き出す）"""
+    buffer = io.StringIO()
     
     try:
-        demo_basic_net()
-        demo_duplication()
-        demo_superposition()
-        demo_ghg_net()
-        demo_type_inhabitation()
-        demo_json_export()
+        with contextlib.redirect_stdout(buffer):
+            print("\n" + "🌐" * 35)
+            print(" " * 15 + "Interaction NET デモ")
+            print("🌐" * 35)
+            
+            # 1 と 6 は同じネットを使う（構築後は変更しない）
+            simple_net = create_simple_net()
+            
+            demo_basic_net(simple_net)
+            demo_duplication()
+            demo_superposition()
+            demo_ghg_net()
+            demo_type_inhabitation()
+            demo_json_export(simple_net)
+            
+            print_header("デモ完了")
+            print("\n次のステップ:")
+            print("  1. テストを実行: python test_interaction_net.py")
+            print("  2. 可視化を確認: outputs/ghg_net.svg")
+            print("  3. HTML版を開く: outputs/interaction_net_visualization.html")
+            print("  4. ドキュメント: INTERACTION_NET_GUIDE.md")
+            
+            print("\n✅ すべてのデモが正常に完了しました！\n")
         
-        print_header("デモ完了")
-        print("\n次のステップ:")
-        print("  1. テストを実行: python test_interaction_net.py")
-        print("  2. 可視化を確認: outputs/ghg_net.svg")
-        print("  3. HTML版を開く: outputs/interaction_net_visualization.html")
-        print("  4. ドキュメント: INTERACTION_NET_GUIDE.md")
-        
-        print("\n✅ すべてのデモが正常に完了しました！\n")
+        sys.stdout.write(buffer.getvalue())
         
     except Exception as e:
+        # エラーまでに出力した内容を先に書き出す
+        sys.stdout.write(buffer.getvalue())
         print(f"\n❌ エラーが発生しました: {e}")
         import traceback
         traceback.print_exc()
@@ -11,8 +11,36 @@ Type Inhabitation の視点：
 - 複数の証明: Superposition による複数の計算方法
 """
 
+from functools import lru_cache
 from interaction_net import InteractionNet, CellType
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+
+# カテゴリ別のノードスタイル
+CATEGORY_STYLES = {
+    'input': 'shape=box, style=filled, fillcolor="#E3F2FD", color="#1976D2", penwidth=2',
+    'calculation': 'shape=ellipse, style=filled, fillcolor="#FFF3E0", color="#F57C00"',
+    'intermediate': 'shape=diamond, style=filled, fillcolor="#F3E5F5", color="#7B1FA2"',
+    'output': 'shape=box, style="filled,rounded", fillcolor="#E8F5E9", color="#388E3C", penwidth=2',
+}
+
+# 関数名に含まれる Scope → エッジの色（上から順に判定）
+SCOPE_COLORS = (
+    ('scope1', '#FF5722'),
+    ('scope2', '#2196F3'),
+    ('scope3', '#4CAF50'),
+)
+
+
+@lru_cache(maxsize=None)
+def scope_color(function: Optional[str]) -> str:
+    """変換関数名からエッジの色を決める（関数名ごとにキャッシュ）"""
+    if function:
+        function = function.lower()
+        for scope, color in SCOPE_COLORS:
+            if scope in function:
+                return color
+    return 'black'
 
 
 class GHGInteractionNet(InteractionNet):
@@ -158,7 +186,11 @@ class GHGInteractionNet(InteractionNet):
         self.add_edge("scope3_total", "report_ghg_mkt", function="aggregate")
     
     def to_dot_styled(self) -> str:
-        """スタイル付きDOT形式に変換"""
+        """スタイル付きDOT形式に変換（to_dot と同様にキャッシュする）"""
+        cached = self._render_cache.get('styled')
+        if cached is not None:
+            return cached
+        
         lines = [
             f'digraph "{self.name}" {{',
             '  rankdir=LR;',
@@ -169,30 +201,15 @@ class GHGInteractionNet(InteractionNet):
             '',
             '  // ノードスタイル定義',
         ]
-        
-        # カテゴリ別スタイル
-        styles = {
-            'input': 'shape=box, style=filled, fillcolor="#E3F2FD", color="#1976D2", penwidth=2',
-            'calculation': 'shape=ellipse, style=filled, fillcolor="#FFF3E0", color="#F57C00"',
-            'intermediate': 'shape=diamond, style=filled, fillcolor="#F3E5F5", color="#7B1FA2"',
-            'output': 'shape=box, style="filled,rounded", fillcolor="#E8F5E9", color="#388E3C", penwidth=2',
-        }
-        
-        # ノードをカテゴリでグループ化
-        grouped = {}
-        for node in self.nodes.values():
-            cat = node.metadata.get('category', 'other')
-            if cat not in grouped:
-                grouped[cat] = []
-            grouped[cat].append(node)
-        
-        # サブグラフでグループ化
-        for cat, nodes in grouped.items():
-            style = styles.get(cat, 'shape=circle')
-            lines.append(f'  subgraph cluster_{cat} {{')
-            lines.append(f'    label="{cat.upper()}";')
-            lines.append(f'    style=dashed;')
-            lines.append(f'    color=gray;')
+        write = lines.append
+        
+        # サブグラフでグループ化（カテゴリ分けは add_node で済んでいる）
+        for cat, nodes in self._by_category.items():
+            style = CATEGORY_STYLES.get(cat, 'shape=circle')
+            write(f'  subgraph cluster_{cat} {{')
+            write(f'    label="{cat.upper()}";')
+            write('    style=dashed;')
+            write('    color=gray;')
             
             for node in nodes:
                 label = node.type_name
@@ -200,13 +217,13 @@ class GHGInteractionNet(InteractionNet):
                     # 改行を含むラベルを整形
                     label = node.value.replace('\n', '\\n')
                 
-                lines.append(f'    "{node.id}" [label="{label}", {style}];')
+                write(f'    "{node.id}" [label="{label}", {style}];')
             
-            lines.append('  }')
-            lines.append('')
+            write('  }')
+            write('')
         
         # セル（重ね合わせ、複製）
-        lines.append('  // セル（計算要素）')
+        write('  // セル（計算要素）')
         for cell in self.cells.values():
             if cell.cell_type == CellType.DUPLICATOR:
                 if cell.metadata.get('superposition'):
@@ -220,13 +237,13 @@ class GHGInteractionNet(InteractionNet):
                     color = '#4ECDC4'
                     label = f"! &{cell.label}="
                 
-                lines.append(f'  "{cell.id}" [label="{label}", shape={shape}, '
-                           f'style=filled, fillcolor="{color}", fontcolor=white];')
+                write(f'  "{cell.id}" [label="{label}", shape={shape}, '
+                      f'style=filled, fillcolor="{color}", fontcolor=white];')
         
         # エッジ
-        lines.append('')
-        lines.append('  // データフロー')
-        for edge in self.edges:
+        write('')
+        write('  // データフロー')
+        for edge, (source_id, target_id) in zip(self.edges, self._edge_ends):
             label = ""
             if edge.function:
                 label = edge.function
@@ -234,20 +251,15 @@ class GHGInteractionNet(InteractionNet):
                 label += f"\\n[{edge.label}]" if label else f"[{edge.label}]"
             
             # Scope別に色分け
-            color = 'black'
-            if 'scope1' in edge.function.lower() if edge.function else False:
-                color = '#FF5722'
-            elif 'scope2' in edge.function.lower() if edge.function else False:
-                color = '#2196F3'
-            elif 'scope3' in edge.function.lower() if edge.function else False:
-                color = '#4CAF50'
+            color = scope_color(edge.function)
             
             label_attr = f'label="{label}"' if label else ''
-            lines.append(f'  "{edge.source.id}" -> "{edge.target.id}" '
-                       f'[{label_attr}, color="{color}", penwidth=1.5];')
+            write(f'  "{source_id}" -> "{target_id}" '
+                  f'[{label_attr}, color="{color}", penwidth=1.5];')
         
-        lines.append('}')
-        return '\n'.join(lines)
+        write('}')
+        dot = self._render_cache['styled'] = '\n'.join(lines)
+        return dot
 
 
 def create_type_inhabitation_demo() -> InteractionNet:
@@ -284,13 +296,17 @@ def create_type_inhabitation_demo() -> InteractionNet:
     return net
 
 
-def visualize_all_examples():
-    """すべての例を可視化"""
+def visualize_all_examples(ghg_net: Optional[GHGInteractionNet] = None):
+    """
+    すべての例を可視化
+    
+    構築済みの GHG ネットを渡すと作り直さずに使う（DOT / JSON もキャッシュ済みなら再利用）
+    """
     import subprocess
     import os
     
     examples = [
-        ("ghg_net", GHGInteractionNet()),
+        ("ghg_net", ghg_net if ghg_net is not None else GHGInteractionNet()),
         ("type_inhabitation", create_type_inhabitation_demo()),
     ]
     
@@ -324,7 +340,7 @@ def visualize_all_examples():
         # JSON形式でも保存
         json_file = f"{output_dir}/{name}.json"
         with open(json_file, 'w') as f:
-            f.write(net.to_json())
+            net.write_json(f)
         results.append(f"  JSON: {json_file}")
     
     return results
@@ -346,6 +362,6 @@ if __name__ == "__main__":
     
     # 可視化
     print("=== Visualization ===")
-    results = visualize_all_examples()
+    results = visualize_all_examples(ghg_net)
     for r in results:
         print(r)
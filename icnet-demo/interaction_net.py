@@ -18,9 +18,9 @@ Interaction Calculusの計算を、グラフ（ネット）として表現・可
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Set, Tuple
+from typing import List, Dict, Iterable, Optional, Set, TextIO, Tuple
 from enum import Enum
-import json
+import sys
 
 
 class CellType(Enum):
@@ -32,7 +32,21 @@ class CellType(Enum):
     FUNCTION = "fn"    # 関数ノード
 
 
-@dataclass
+# to_dot のノードのスタイル定義（カテゴリ別）とセルの形
+NODE_STYLES = {
+    'data': 'fillcolor=lightblue',
+    'function': 'fillcolor=lightgreen',
+    'result': 'fillcolor=lightyellow',
+}
+
+CELL_SHAPES = {
+    CellType.CONSTRUCTOR: 'triangle',
+    CellType.DUPLICATOR: 'diamond',
+    CellType.ERASER: 'square',
+}
+
+
+@dataclass(slots=True)
 class Node:
     """ノード（型・データを表す）"""
     id: str
@@ -44,7 +58,7 @@ class Node:
         return hash(self.id)
 
 
-@dataclass
+@dataclass(slots=True)
 class Edge:
     """エッジ（データフロー）"""
     source: Node
@@ -54,7 +68,7 @@ class Edge:
     metadata: Dict = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class Cell:
     """セル（計算要素）"""
     id: str
@@ -64,6 +78,13 @@ class Cell:
     metadata: Dict = field(default_factory=dict)
 
 
+def cell_kind(cell: Cell) -> str:
+    """セルの種類名（重ね合わせは DUPLICATOR と区別して 'superposition'）"""
+    if cell.metadata.get('superposition'):
+        return 'superposition'
+    return cell.cell_type.name.lower()
+
+
 class InteractionNet:
     """Interaction NET - 計算グラフ"""
     
@@ -71,12 +92,42 @@ class InteractionNet:
         self.name = name
         self.nodes: Dict[str, Node] = {}
         self.edges: List[Edge] = []
+        # self.edges と同じ並びの (始点ID, 終点ID) 列（出力時に Node を辿らない）
+        self._edge_ends: List[Tuple[str, str]] = []
         self.cells: Dict[str, Cell] = {}
+        # ノードID → 整数インデックス、インデックス → (出るエッジ, 終点インデックス) / 入るエッジ（追加順）
+        self._index: Dict[str, int] = {}
+        self._out: List[List[Tuple[Edge, int]]] = []
+        self._in: List[List[Edge]] = []
+        # (start_id, end_id) → find_paths の結果。ネットを変更したら捨てる
+        self._paths_cache: Dict[Tuple[str, str], List[Tuple[Edge, ...]]] = {}
+        # セルID → ポートのノードID 列（出力時に Node を辿らない）
+        self._cell_port_ids: Dict[str, Tuple[str, ...]] = {}
+        # セルの種類（cell_kind）→ セル（追加順）
+        self._cells_by_kind: Dict[str, List[Cell]] = {}
+        # カテゴリ（metadata['category']、無ければ 'other'）→ ノード（追加順）
+        self._by_category: Dict[str, List[Node]] = {}
+        # 出力形式・描画オプション → DOT / JSON 文字列。ネットを変更したら捨てる
+        self._render_cache: Dict[object, str] = {}
         
     def add_node(self, node_id: str, type_name: str, value: Optional[str] = None, **metadata) -> Node:
         """ノードを追加"""
+        # 型名・カテゴリは多くのノードで共通なのでインターンしておく
+        type_name = sys.intern(type_name)
+        category = metadata.get('category')
+        if isinstance(category, str):
+            metadata['category'] = sys.intern(category)
         node = Node(node_id, type_name, value, metadata)
+        replaced = node_id in self.nodes
         self.nodes[node_id] = node
+        if replaced:
+            # 置き換えたノードは元の位置に残るので作り直す
+            self._by_category = {}
+            for n in self.nodes.values():
+                self._by_category.setdefault(n.metadata.get('category', 'other'), []).append(n)
+        else:
+            self._by_category.setdefault(metadata.get('category', 'other'), []).append(node)
+        self._invalidate()
         return node
     
     def add_edge(self, source_id: str, target_id: str, label: Optional[str] = None, 
@@ -84,18 +135,73 @@ class InteractionNet:
         """エッジを追加"""
         source = self.nodes[source_id]
         target = self.nodes[target_id]
+        # 関数名・ラベル（&L など）も語彙が小さいのでインターンしておく
+        if function is not None:
+            function = sys.intern(function)
+        if label is not None:
+            label = sys.intern(label)
         edge = Edge(source, target, label, function, metadata)
         self.edges.append(edge)
+        self._edge_ends.append((source_id, target_id))
+        target_idx = self._node_index(target_id)
+        self._out[self._node_index(source_id)].append((edge, target_idx))
+        self._in[target_idx].append(edge)
+        self._invalidate()
         return edge
     
+    def _invalidate(self):
+        """ネットの変更で古くなるキャッシュを捨てる"""
+        self._paths_cache.clear()
+        self._render_cache.clear()
+    
+    def _node_index(self, node_id: str) -> int:
+        """パス探索用の整数インデックス（初出時に割り当て）"""
+        idx = self._index.get(node_id)
+        if idx is None:
+            idx = self._index[node_id] = len(self._out)
+            self._out.append([])
+            self._in.append([])
+        return idx
+    
+    def out_edges(self, node_id: str) -> List[Edge]:
+        """ノードから出るエッジ（追加順）"""
+        idx = self._index.get(node_id)
+        return [] if idx is None else [edge for edge, _ in self._out[idx]]
+    
+    def in_edges(self, node_id: str) -> List[Edge]:
+        """ノードに入るエッジ（追加順）"""
+        idx = self._index.get(node_id)
+        return [] if idx is None else list(self._in[idx])
+    
     def add_cell(self, cell_id: str, cell_type: CellType, port_ids: List[str], 
                  label: Optional[str] = None, **metadata) -> Cell:
         """セルを追加"""
         ports = [self.nodes[pid] for pid in port_ids]
+        if label is not None:
+            label = sys.intern(label)
         cell = Cell(cell_id, cell_type, ports, label, metadata)
+        replaced = cell_id in self.cells
         self.cells[cell_id] = cell
+        self._cell_port_ids[cell_id] = tuple(port_ids)
+        if replaced:
+            # 置き換えたセルは元の位置に残るので作り直す
+            self._cells_by_kind = {}
+            for c in self.cells.values():
+                self._cells_by_kind.setdefault(cell_kind(c), []).append(c)
+        else:
+            self._cells_by_kind.setdefault(cell_kind(cell), []).append(cell)
+        self._render_cache.clear()
         return cell
     
+    def cells_of_kind(self, kind: str) -> List[Cell]:
+        """
+        種類ごとのセル（追加順）
+        
+        kind は 'superposition'（重ね合わせ）, 'duplicator'（重ね合わせ以外の複製）,
+        'constructor', 'eraser' のいずれか
+        """
+        return list(self._cells_by_kind.get(kind, ()))
+    
     def add_duplicator(self, input_id: str, output1_id: str, output2_id: str, 
                       label: str = "L") -> Cell:
         """デュプリケータを追加（複製）"""
@@ -118,33 +224,178 @@ class InteractionNet:
                            [param_id, body_id, result_id])
     
     def find_paths(self, start_id: str, end_id: str) -> List[List[Edge]]:
-        """2つのノード間のパスを探索（Type Inhabitation）"""
-        paths = []
-        visited = set()
+        """
+        2つのノード間のパスを探索（Type Inhabitation）
         
-        def dfs(current_id: str, path: List[Edge]):
-            if current_id == end_id:
-                paths.append(path.copy())
-                return
-            
-            if current_id in visited:
-                return
-            
-            visited.add(current_id)
-            
-            for edge in self.edges:
-                if edge.source.id == current_id:
-                    path.append(edge)
-                    dfs(edge.target.id, path)
-                    path.pop()
-            
-            visited.remove(current_id)
+        結果は (start_id, end_id) ごとにキャッシュする
+        """
+        key = (start_id, end_id)
+        cached = self._paths_cache.get(key)
+        if cached is None:
+            cached = self._search_paths(start_id, end_id)
+            self._paths_cache[key] = cached
+        return [list(path) for path in cached]
+    
+    def find_paths_multi(self, start_id: str, end_ids: Iterable[str]) -> Dict[str, List[List[Edge]]]:
+        """
+        1つの始点から複数の終点へのパスをまとめて探索
+        
+        共通の部分パスを1回の DFS で辿る。各終点の結果は find_paths と同じ
+        """
+        found: Dict[str, List[Tuple[Edge, ...]]] = {}
+        pending = []
+        for end_id in end_ids:
+            cached = self._paths_cache.get((start_id, end_id))
+            if cached is None:
+                pending.append(end_id)
+            else:
+                found[end_id] = cached
+        
+        if pending:
+            for end_id, paths in self._search_paths_multi(start_id, pending).items():
+                self._paths_cache[(start_id, end_id)] = paths
+                found[end_id] = paths
+        return {end_id: [list(path) for path in paths] for end_id, paths in found.items()}
+    
+    def _search_paths(self, start_id: str, end_id: str) -> List[Tuple[Edge, ...]]:
+        """ID を整数インデックスに直して探索する（到達し得ないクエリは探索しない）"""
+        if start_id == end_id:
+            return [()]
+        start = self._index.get(start_id)
+        end = self._index.get(end_id)
+        # エッジの無いノード・入ってくるエッジの無い終点には届かない
+        if start is None or end is None or not self._in[end]:
+            return []
+        paths = self._dag_paths(start, end)
+        if paths is None:
+            paths = self._dfs_paths(start, end)
+        return paths
+    
+    def _search_paths_multi(self, start_id: str, end_ids: List[str]) -> Dict[str, List[Tuple[Edge, ...]]]:
+        """終点ごとのパスを1回の DFS で集める（終点を通り抜けて他の終点へも進む）"""
+        results: Dict[str, List[Tuple[Edge, ...]]] = {end_id: [] for end_id in end_ids}
+        if start_id in results:
+            results[start_id] = [()]
+        
+        index = self._index
+        start = index.get(start_id)
+        goals: Dict[int, str] = {}
+        for end_id in results:
+            end = index.get(end_id)
+            if end_id != start_id and end is not None and self._in[end]:
+                goals[end] = end_id
+        if start is None or not goals:
+            return results
+        
+        # どの終点にも届かないノードには進まない（入るエッジを終点から逆に辿る）
+        useful = [False] * len(self._out)
+        stack = list(goals)
+        for end in stack:
+            useful[end] = True
+        while stack:
+            for edge in self._in[stack.pop()]:
+                source = index[edge.source.id]
+                if not useful[source]:
+                    useful[source] = True
+                    stack.append(source)
+        
+        out = self._out
+        visited = [False] * len(out)
+        visited[start] = True
+        stack = [(start, iter(out[start]), ())]
+        while stack:
+            current, pending, prefix = stack[-1]
+            for edge, target in pending:
+                if visited[target] or not useful[target]:
+                    continue
+                path = prefix + (edge,)
+                end_id = goals.get(target)
+                if end_id is not None:
+                    results[end_id].append(path)
+                visited[target] = True
+                stack.append((target, iter(out[target]), path))
+                break
+            else:
+                stack.pop()
+                visited[current] = False
+        return results
+    
+    def _dag_paths(self, start: int, end: int) -> Optional[List[Tuple[Edge, ...]]]:
+        """
+        各ノードから end までの部分パスをメモ化して列挙する
+        
+        到達範囲に閉路があれば None（訪問済み判定が必要なので DFS に任せる）。
+        閉路がなければ DFS と同じ順序で同じパスを返す
+        """
+        out = self._out
+        memo: List[Optional[List[Tuple[Edge, ...]]]] = [None] * len(out)
+        on_path = [False] * len(out)
+        arrived = [()]
         
-        dfs(start_id, [])
+        # 帰りがけ順に部分パスを確定させる（明示的なスタックで再帰しない）
+        on_path[start] = True
+        stack = [(start, iter(out[start]))]
+        while stack:
+            current, pending = stack[-1]
+            for _, target in pending:
+                if target == end or memo[target] is not None:
+                    continue
+                if on_path[target]:
+                    return None
+                on_path[target] = True
+                stack.append((target, iter(out[target])))
+                break
+            else:
+                stack.pop()
+                on_path[current] = False
+                memo[current] = [
+                    (edge,) + rest
+                    for edge, target in out[current]
+                    for rest in (arrived if target == end else memo[target])
+                ]
+        return memo[start]
+    
+    def _dfs_paths(self, start: int, end: int) -> List[Tuple[Edge, ...]]:
+        """訪問済みノードを避ける DFS でパスを列挙"""
+        out = self._out
+        visited = [False] * len(out)
+        paths = []
+        
+        # (ノード, 未処理の出エッジ, そこまでのパス) のスタック
+        visited[start] = True
+        stack = [(start, iter(out[start]), ())]
+        while stack:
+            current, pending, prefix = stack[-1]
+            for edge, target in pending:
+                if target == end:
+                    paths.append(prefix + (edge,))
+                elif not visited[target]:
+                    visited[target] = True
+                    stack.append((target, iter(out[target]), prefix + (edge,)))
+                    break
+            else:
+                stack.pop()
+                visited[current] = False
         return paths
     
     def to_dot(self, show_cells: bool = True, highlight_paths: Optional[List[List[Edge]]] = None) -> str:
-        """Graphviz DOT形式に変換"""
+        """
+        Graphviz DOT形式に変換
+        
+        結果は show_cells と強調するエッジの組ごとにキャッシュする
+        （add_node / add_edge / add_cell で破棄）
+        """
+        highlighted = set()
+        if highlight_paths:
+            for path in highlight_paths:
+                for edge in path:
+                    highlighted.add((edge.source.id, edge.target.id))
+        
+        key = (show_cells, frozenset(highlighted))
+        cached = self._render_cache.get(key)
+        if cached is not None:
+            return cached
+        
         lines = [
             f'digraph "{self.name}" {{',
             '  rankdir=LR;',
@@ -153,16 +404,9 @@ class InteractionNet:
             ''
         ]
         
-        # ノードのスタイル定義
-        node_styles = {
-            'data': 'fillcolor=lightblue',
-            'function': 'fillcolor=lightgreen',
-            'result': 'fillcolor=lightyellow',
-        }
-        
         # ノード定義
         for node in self.nodes.values():
-            style = node_styles.get(node.metadata.get('category', 'data'), 'fillcolor=lightgray')
+            style = NODE_STYLES.get(node.metadata.get('category', 'data'), 'fillcolor=lightgray')
             label = f"{node.type_name}"
             if node.value:
                 # ダブルクォートをエスケープ
@@ -174,11 +418,7 @@ class InteractionNet:
         # セルを表示
         if show_cells:
             for cell in self.cells.values():
-                shape = {
-                    CellType.CONSTRUCTOR: 'triangle',
-                    CellType.DUPLICATOR: 'diamond',
-                    CellType.ERASER: 'square',
-                }.get(cell.cell_type, 'circle')
+                shape = CELL_SHAPES.get(cell.cell_type, 'circle')
                 
                 label = f"{cell.cell_type.value}"
                 if cell.label:
@@ -187,35 +427,56 @@ class InteractionNet:
                 lines.append(f'  "{cell.id}" [label="{label}", shape={shape}, fillcolor=lightcoral];')
                 
                 # セルとポートの接続
-                for i, port in enumerate(cell.ports):
-                    lines.append(f'  "{cell.id}" -> "{port.id}" [style=dashed, label="p{i}"];')
+                for i, port_id in enumerate(self._cell_port_ids[cell.id]):
+                    lines.append(f'  "{cell.id}" -> "{port_id}" [style=dashed, label="p{i}"];')
         
         # エッジ定義
-        highlighted = set()
-        if highlight_paths:
-            for path in highlight_paths:
-                for edge in path:
-                    highlighted.add((edge.source.id, edge.target.id))
-        
-        for edge in self.edges:
+        for edge, ends in zip(self.edges, self._edge_ends):
             edge_label = ""
             if edge.function:
                 edge_label = edge.function
             if edge.label:
                 edge_label += f" [{edge.label}]" if edge_label else f"[{edge.label}]"
             
-            is_highlighted = (edge.source.id, edge.target.id) in highlighted
-            style = 'color=red, penwidth=2' if is_highlighted else ''
+            style = 'color=red, penwidth=2' if ends in highlighted else ''
             
             label_attr = f'label="{edge_label}"' if edge_label else ''
-            lines.append(f'  "{edge.source.id}" -> "{edge.target.id}" [{label_attr}, {style}];')
+            lines.append(f'  "{ends[0]}" -> "{ends[1]}" [{label_attr}, {style}];')
         
         lines.append('}')
-        return '\n'.join(lines)
+        dot = self._render_cache[key] = '\n'.join(lines)
+        return dot
     
     def to_json(self) -> str:
-        """JSON形式に変換（デバッグ用）"""
-        return json.dumps({
+        """JSON形式に変換（デバッグ用、to_dot と同様にキャッシュする）"""
+        import json
+        
+        cached = self._render_cache.get('json')
+        if cached is not None:
+            return cached
+        
+        text = self._render_cache['json'] = json.dumps(self._json_payload(), indent=2)
+        return text
+    
+    def write_json(self, fp: TextIO):
+        """
+        to_json と同じ内容をファイルに書き出す
+        
+        キャッシュが無ければ文字列全体を組み立てずに少しずつ書き出す
+        """
+        import json
+        
+        cached = self._render_cache.get('json')
+        if cached is not None:
+            fp.write(cached)
+            return
+        
+        for chunk in json.JSONEncoder(indent=2).iterencode(self._json_payload()):
+            fp.write(chunk)
+    
+    def _json_payload(self) -> Dict:
+        """to_json / write_json で出力する内容"""
+        return {
             'name': self.name,
             'nodes': [
                 {
@@ -228,25 +489,25 @@ class InteractionNet:
             ],
             'edges': [
                 {
-                    'source': e.source.id,
-                    'target': e.target.id,
+                    'source': source_id,
+                    'target': target_id,
                     'label': e.label,
                     'function': e.function,
                     'metadata': e.metadata
                 }
-                for e in self.edges
+                for e, (source_id, target_id) in zip(self.edges, self._edge_ends)
             ],
             'cells': [
                 {
                     'id': c.id,
                     'type': c.cell_type.value,
-                    'ports': [p.id for p in c.ports],
+                    'ports': list(self._cell_port_ids[c.id]),
                     'label': c.label,
                     'metadata': c.metadata
                 }
                 for c in self.cells.values()
             ]
-        }, indent=2)
+        }
 
 
 def create_simple_net() -> InteractionNet:
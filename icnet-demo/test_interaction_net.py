@@ -12,6 +12,7 @@ Interaction NET のテストスイート
 import unittest
 import sys
 import os
+from functools import lru_cache
 
 # パスを追加
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -23,6 +24,18 @@ from interaction_net import (
 from ghg_net_visualizer import GHGInteractionNet, create_type_inhabitation_demo
 
 
+@lru_cache(maxsize=None)
+def all_example_nets():
+    """サンプルネット一式（読み取り専用のテストで共有する）"""
+    return (
+        create_simple_net(),
+        create_duplication_net(),
+        create_superposition_net(),
+        GHGInteractionNet(),
+        create_type_inhabitation_demo()
+    )
+
+
 class TestInteractionNet(unittest.TestCase):
     """InteractionNetの基本機能テスト"""
     
@@ -49,6 +62,20 @@ class TestInteractionNet(unittest.TestCase):
         self.assertEqual(edge.function, "toString")
         self.assertEqual(len(net.edges), 1)
     
+    def test_edge_accessors(self):
+        """ノードごとの出るエッジ・入るエッジ"""
+        net = InteractionNet("TestNet")
+        for node_id in ("a", "b", "c"):
+            net.add_node(node_id, "T")
+        ab = net.add_edge("a", "b")
+        cb = net.add_edge("c", "b")
+        ac = net.add_edge("a", "c")
+        
+        self.assertEqual(net.out_edges("a"), [ab, ac])
+        self.assertEqual(net.in_edges("b"), [ab, cb])
+        self.assertEqual(net.in_edges("a"), [])
+        self.assertEqual(net.out_edges("missing"), [])
+    
     def test_duplicator_cell(self):
         """デュプリケータセルのテスト"""
         net = InteractionNet("TestNet")
@@ -88,6 +115,33 @@ class TestInteractionNet(unittest.TestCase):
         self.assertEqual(cell.cell_type, CellType.CONSTRUCTOR)
         self.assertEqual(len(cell.ports), 3)
     
+    def test_cells_of_kind(self):
+        """cells_of_kind はセル一覧を種類で絞り込んだ結果と一致"""
+        net = InteractionNet("TestNet")
+        for node_id in ("a", "b", "c", "d"):
+            net.add_node(node_id, "Int")
+        net.add_duplicator("a", "b", "c", "L")
+        net.add_superposition("b", "c", "d", "S")
+        net.add_lambda("a", "b", "c")
+        net.add_cell("era_d", CellType.ERASER, ["d"])
+        # 同じIDで種類の違うセルに置き換える
+        net.add_cell("dup_L_a", CellType.DUPLICATOR, ["a", "b", "c"], "L",
+                     superposition=True)
+        net.add_duplicator("d", "a", "b", "R")
+        
+        filters = {
+            'superposition': lambda c: c.metadata.get('superposition'),
+            'duplicator': lambda c: (c.cell_type == CellType.DUPLICATOR
+                                     and not c.metadata.get('superposition')),
+            'constructor': lambda c: c.cell_type == CellType.CONSTRUCTOR,
+            'eraser': lambda c: c.cell_type == CellType.ERASER,
+        }
+        for kind, keep in filters.items():
+            expected = [c for c in net.cells.values() if keep(c)]
+            self.assertEqual(net.cells_of_kind(kind), expected, kind)
+        self.assertEqual([c.id for c in net.cells_of_kind('superposition')],
+                         ["dup_L_a", "sup_S_b"])
+    
     def test_path_finding(self):
         """パス探索のテスト"""
         net = InteractionNet("TestNet")
@@ -125,6 +179,35 @@ class TestInteractionNet(unittest.TestCase):
         
         self.assertEqual(len(paths), 2)
     
+    def test_path_cache_invalidated_on_edit(self):
+        """エッジを追加するとパス探索のキャッシュが更新される（閉路を含む）"""
+        net = InteractionNet("TestNet")
+        for node_id in ("a", "b", "c"):
+            net.add_node(node_id, "T")
+        net.add_edge("a", "b", function="ab")
+        self.assertEqual(net.find_paths("a", "c"), [])
+        
+        net.add_edge("b", "a", function="ba")
+        net.add_edge("b", "c", function="bc")
+        paths = net.find_paths("a", "c")
+        self.assertEqual([[e.function for e in p] for p in paths], [["ab", "bc"]])
+    
+    def test_long_chain_path(self):
+        """再帰上限を超える長さのパスも探索できる"""
+        net = InteractionNet("TestNet")
+        length = sys.getrecursionlimit() + 100
+        for i in range(length + 1):
+            net.add_node(f"n{i}", "T")
+        for i in range(length):
+            net.add_edge(f"n{i}", f"n{i + 1}")
+        
+        paths = net.find_paths("n0", f"n{length}")
+        self.assertEqual([len(p) for p in paths], [length])
+        
+        # 閉路があっても同じ結果になる
+        net.add_edge(f"n{length}", "n0")
+        self.assertEqual([len(p) for p in net.find_paths("n0", f"n{length}")], [length])
+    
     def test_to_dot(self):
         """DOT形式変換のテスト"""
         net = InteractionNet("TestNet")
@@ -139,6 +222,21 @@ class TestInteractionNet(unittest.TestCase):
         self.assertIn('"n2"', dot)
         self.assertIn('toString', dot)
     
+    def test_to_dot_cache_invalidated_on_edit(self):
+        """DOT出力はキャッシュされ、ネットを変更すると作り直される"""
+        net = InteractionNet("TestNet")
+        net.add_node("n1", "Int")
+        dot = net.to_dot()
+        self.assertIs(net.to_dot(), dot)
+        
+        net.add_node("n2", "String")
+        net.add_edge("n1", "n2", function="toString")
+        self.assertIn('"n1" -> "n2"', net.to_dot())
+        
+        net.add_duplicator("n1", "n2", "n2")
+        self.assertIn("δ_L", net.to_dot())
+        self.assertNotIn("δ_L", net.to_dot(show_cells=False))
+    
     def test_to_json(self):
         """JSON形式変換のテスト"""
         net = InteractionNet("TestNet")
@@ -150,6 +248,15 @@ class TestInteractionNet(unittest.TestCase):
         self.assertIn('"name": "TestNet"', json_str)
         self.assertIn('"n1"', json_str)
         self.assertIn('"Int"', json_str)
+    
+    def test_write_json(self):
+        """write_json は to_json と同じ内容を書き出す"""
+        import io
+        net = create_simple_net()
+        
+        streamed = io.StringIO()
+        net.write_json(streamed)
+        self.assertEqual(streamed.getvalue(), net.to_json())
 
 
 class TestExampleNets(unittest.TestCase):
@@ -193,9 +300,10 @@ class TestExampleNets(unittest.TestCase):
 class TestGHGNet(unittest.TestCase):
     """GHG特化ネットのテスト"""
     
-    def setUp(self):
-        """各テストの前に実行"""
-        self.ghg_net = GHGInteractionNet()
+    @classmethod
+    def setUpClass(cls):
+        """クラスで一度だけ構築（各テストはネットを変更しない）"""
+        cls.ghg_net = GHGInteractionNet()
     
     def test_input_nodes(self):
         """入力ノードの存在確認"""
@@ -294,9 +402,10 @@ class TestGHGNet(unittest.TestCase):
 class TestTypeInhabitation(unittest.TestCase):
     """Type Inhabitationデモのテスト"""
     
-    def setUp(self):
-        """各テストの前に実行"""
-        self.net = create_type_inhabitation_demo()
+    @classmethod
+    def setUpClass(cls):
+        """クラスで一度だけ構築（各テストはネットを変更しない）"""
+        cls.net = create_type_inhabitation_demo()
     
     def test_input_output_nodes(self):
         """入力・出力ノードの確認"""
@@ -313,6 +422,15 @@ class TestTypeInhabitation(unittest.TestCase):
         paths = self.net.find_paths("int_input", "str_via_float")
         self.assertGreater(len(paths), 0, "Should find path via Float")
     
+    def test_find_paths_multi(self):
+        """複数の終点をまとめて探索しても find_paths と同じ結果になる"""
+        ends = ["str_direct", "str_via_float", "str_via_bool", "int_input"]
+        proofs = self.net.find_paths_multi("int_input", ends)
+        
+        fresh = create_type_inhabitation_demo()
+        for end_id in ends:
+            self.assertEqual(proofs[end_id], fresh.find_paths("int_input", end_id))
+    
     def test_proof_metadata(self):
         """証明のメタデータ確認"""
         edges_with_proof = [e for e in self.net.edges 
@@ -328,15 +446,7 @@ class TestVisualization(unittest.TestCase):
     
     def test_dot_syntax_validity(self):
         """DOT構文の妥当性確認"""
-        nets = [
-            create_simple_net(),
-            create_duplication_net(),
-            create_superposition_net(),
-            GHGInteractionNet(),
-            create_type_inhabitation_demo()
-        ]
-        
-        for net in nets:
+        for net in all_example_nets():
             dot = net.to_dot()
             
             # 基本的な構文チェック